@@ -0,0 +1,44 @@
+import argparse
+from typing import List, Optional
+
+from app import functions, migrations
+from app.db import SessionLocal, engine
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Запускает служебные команды склада.
+
+    Команды:
+        upgrade-schema: Приводит схему базы данных к текущим моделям.
+        refresh-stats: Пересобирает суточную сводку daily_coil_stats.
+
+    Аргументы:
+        argv: Аргументы командной строки (по умолчанию sys.argv).
+    """
+    parser = argparse.ArgumentParser(
+        description="Служебные команды склада металлопроката."
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser(
+        "upgrade-schema", help="Привести схему базы данных к текущим моделям."
+    )
+    commands.add_parser(
+        "refresh-stats", help="Пересобрать суточную сводку по таблице руллонов."
+    )
+    args = parser.parse_args(argv)
+
+    if args.command == "upgrade-schema":
+        migrations.upgrade_schema(engine)
+        print("Схема базы данных обновлена.")
+    elif args.command == "refresh-stats":
+        migrations.upgrade_schema(engine)
+        db = SessionLocal()
+        try:
+            days = functions.refresh_daily_stats(db)
+        finally:
+            db.close()
+        print(f"Суточная сводка пересобрана: {days} дн.")
+
+
+if __name__ == "__main__":
+    main()
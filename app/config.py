@@ -5,11 +5,16 @@ class Settings(BaseSettings):
     """Конфигурация приложения с настройками базы данных.
 
     Атрибуты:
-        DATABASE_URL (str): URL основной базы данных.
+        DATABASE_URL (str): URL основной базы данных. SQLite в памяти
+            поддерживается только для однопоточной работы.
         TEST_DATABASE_URL (str): URL тестовой базы данных.
+        DB_POOL_SIZE (int): Размер пула соединений (кроме SQLite).
+        DB_MAX_OVERFLOW (int): Допустимое число соединений сверх пула.
     """
     DATABASE_URL: str
     TEST_DATABASE_URL: str
+    DB_POOL_SIZE: int = 20
+    DB_MAX_OVERFLOW: int = 10
 
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8")
 
@@ -1,16 +1,81 @@
-from typing import Generator
+from typing import Any, Generator
 
-from sqlalchemy import create_engine
+from sqlalchemy import Engine, create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import Session, declarative_base, sessionmaker
+from sqlalchemy.pool import StaticPool
 
 from app.config import settings
 
-engine = create_engine(settings.DATABASE_URL, connect_args={"check_same_thread": False})
+
+def _set_sqlite_pragmas(dbapi_connection: Any, connection_record: Any) -> None:
+    """Настраивает новое соединение SQLite.
+
+    WAL позволяет читать параллельно с записью, synchronous=NORMAL убирает
+    fsync на каждый коммит, временные таблицы сортировок держатся в памяти.
+
+    Аргументы:
+        dbapi_connection: Соединение sqlite3.
+        connection_record: Запись пула соединений.
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+
+def create_db_engine(url: str) -> Engine:
+    """Создаёт движок SQLAlchemy с пулом соединений под тип базы данных.
+
+    Для SQLite в памяти используется одно общее соединение (StaticPool),
+    иначе каждое соединение видело бы свою пустую базу. Это соединение
+    ничем не защищено от одновременного использования, поэтому база в
+    памяти годится только для однопоточной работы (тесты, отладка): при
+    запуске под uvicorn обработчики из пула потоков делили бы одно
+    соединение sqlite3 без блокировок. Для остальных баз используется
+    QueuePool с проверкой соединений перед выдачей.
+
+    Аргументы:
+        url: URL базы данных.
+
+    Возвращает:
+        Engine: Движок базы данных.
+    """
+    db_url = make_url(url)
+    if db_url.get_backend_name() == "sqlite":
+        options: dict[str, Any] = {"connect_args": {"check_same_thread": False}}
+        if db_url.database in (None, "", ":memory:"):
+            options["poolclass"] = StaticPool
+        sqlite_engine = create_engine(db_url, **options)
+        event.listen(sqlite_engine, "connect", _set_sqlite_pragmas)
+        return sqlite_engine
+    return create_engine(
+        db_url,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_pre_ping=True,
+    )
+
+
+engine = create_db_engine(settings.DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
 
+def get_session_factory() -> sessionmaker[Session]:
+    """Предоставляет фабрику сессий базы данных.
+
+    Нужна потоковым ответам: зависимость get_db закрывает свою сессию до
+    отправки тела ответа, поэтому генератор тела открывает собственную.
+
+    Возвращает:
+        sessionmaker: Фабрика сессий SQLAlchemy.
+    """
+    return SessionLocal
+
+
 def get_db() -> Generator[Session, None, None]:
     """Предоставляет сессию базы данных.
 
@@ -1,13 +1,71 @@
-from datetime import UTC, datetime, timedelta
-from typing import Any, Dict, List, Optional, Tuple
+from datetime import UTC, date, datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
 
-from sqlalchemy import and_, extract, func, or_
-from sqlalchemy.orm import Session
+from sqlalchemy import (
+    CompoundSelect,
+    Connection,
+    Dialect,
+    Row,
+    RowMapping,
+    Select,
+    and_,
+    case,
+    delete,
+    event,
+    func,
+    insert,
+    inspect,
+    literal,
+    or_,
+    select,
+    union_all,
+    update,
+)
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import InstanceState, Mapper, Session
 
 from app import models, schemas
 
+# Колонки руллона, которые возвращаются без загрузки ORM-объектов.
+_COIL_COLUMNS = (
+    models.Coil.id,
+    models.Coil.length,
+    models.Coil.weight,
+    models.Coil.date_added,
+    models.Coil.date_removed,
+)
 
-def create_coil(db: Session, coil: schemas.CoilCreate) -> models.Coil:
+
+def create_coils_bulk(db: Session, coils: List[schemas.CoilCreate]) -> List[Row]:
+    """Создаёт несколько руллонов одним запросом INSERT ... RETURNING.
+
+    Аргументы:
+        db: Сессия базы данных.
+        coils: Данные для создания руллонов.
+
+    Возвращает:
+        Строки созданных руллонов в порядке входных данных.
+    """
+    if not coils:
+        return []
+    created = list(
+        db.execute(
+            insert(models.Coil).returning(*_COIL_COLUMNS, sort_by_parameter_order=True),
+            [coil.model_dump() for coil in coils],
+        ).all()
+    )
+
+    added_by_day: Dict[date, Tuple[int, float]] = {}
+    for row in created:
+        count, weight = added_by_day.get(row.date_added.date(), (0, 0.0))
+        added_by_day[row.date_added.date()] = (count + 1, weight + row.weight)
+    for day, (count, weight) in added_by_day.items():
+        _track_daily_stats(db, day, count, 0, weight)
+    db.commit()
+    return created
+
+
+def create_coil(db: Session, coil: schemas.CoilCreate) -> Row:
     """Создаёт новый руллон в базе данных.
 
     Args:
@@ -17,16 +75,15 @@ def create_coil(db: Session, coil: schemas.CoilCreate) -> models.Coil:
     Returns:
         Созданный руллон.
     """
-    db_coil = models.Coil(**coil.model_dump())
-    db.add(db_coil)
-    db.commit()
-    db.refresh(db_coil)
-    return db_coil
+    return create_coils_bulk(db, [coil])[0]
 
 
-def remove_coil(db: Session, coil_id: int) -> Optional[models.Coil]:
+def remove_coil(db: Session, coil_id: int) -> Optional[Row]:
     """Удаляет руллон по его идентификатору.
 
+    Проверка и отметка об удалении выполняются одним атомарным
+    UPDATE ... RETURNING, поэтому руллон не может быть удалён дважды.
+
     Аргументы:
         db: Сессия базы данных.
         coil_id: Идентификатор руллона.
@@ -34,27 +91,32 @@ def remove_coil(db: Session, coil_id: int) -> Optional[models.Coil]:
     Возвращает:
         Удалённый руллон или None, если руллон не найден или уже удален.
     """
-    coil = db.query(models.Coil).filter(models.Coil.id == coil_id).first()
-    if coil and coil.date_removed is None:
-        coil.date_removed = datetime.now(UTC)
-        db.commit()
-        db.refresh(coil)
-        return coil
-    return None
+    now = datetime.now(UTC)
+    coil = db.execute(
+        update(models.Coil)
+        .where(models.Coil.id == coil_id, models.Coil.date_removed.is_(None))
+        .values(date_removed=now)
+        .returning(*_COIL_COLUMNS)
+    ).first()
+    if coil is None:
+        return None
+    _track_daily_stats(db, coil.date_removed.date(), 0, 1, -coil.weight)
+    db.commit()
+    return coil
 
 
-def get_coils(
-    db: Session,
+def _coils_statement(
     id_range: Optional[Tuple[int, int]] = None,
     weight_range: Optional[Tuple[float, float]] = None,
     length_range: Optional[Tuple[float, float]] = None,
     date_added_range: Optional[Tuple[datetime, datetime]] = None,
     date_removed_range: Optional[Tuple[datetime, datetime]] = None,
-) -> List[models.Coil]:
-    """Получает список руллонов с фильтрацией.
+) -> Select:
+    """Строит запрос колонок руллонов с фильтрацией.
+
+    Выбираются только колонки, без загрузки ORM-объектов в сессию.
 
     Аргументы:
-        db: Сессия базы данных.
         id_range: Диапазон идентификаторов.
         weight_range: Диапазон веса.
         length_range: Диапазон длины.
@@ -62,31 +124,345 @@ def get_coils(
         date_removed_range: Диапазон дат удаления.
 
     Возвращает:
-        Список руллонов, соответствующих фильтрам.
+        Запрос руллонов, соответствующих фильтрам.
     """
-    query = db.query(models.Coil)
+    stmt = select(*_COIL_COLUMNS)
 
     if id_range:
-        query = query.filter(models.Coil.id.between(id_range[0], id_range[1]))
+        stmt = stmt.where(models.Coil.id.between(id_range[0], id_range[1]))
     if weight_range:
-        query = query.filter(
-            models.Coil.weight.between(weight_range[0], weight_range[1])
-        )
+        stmt = stmt.where(models.Coil.weight.between(weight_range[0], weight_range[1]))
     if length_range:
-        query = query.filter(
-            models.Coil.length.between(length_range[0], length_range[1])
-        )
+        stmt = stmt.where(models.Coil.length.between(length_range[0], length_range[1]))
     if date_added_range:
-        query = query.filter(
+        stmt = stmt.where(
             models.Coil.date_added.between(date_added_range[0], date_added_range[1])
         )
     if date_removed_range:
-        query = query.filter(
+        stmt = stmt.where(
             models.Coil.date_removed.between(
                 date_removed_range[0], date_removed_range[1]
             )
         )
-    return query.all()
+    return stmt
+
+
+def get_coils(
+    db: Session,
+    id_range: Optional[Tuple[int, int]] = None,
+    weight_range: Optional[Tuple[float, float]] = None,
+    length_range: Optional[Tuple[float, float]] = None,
+    date_added_range: Optional[Tuple[datetime, datetime]] = None,
+    date_removed_range: Optional[Tuple[datetime, datetime]] = None,
+) -> List[Row]:
+    """Получает список руллонов с фильтрацией.
+
+    Аргументы:
+        db: Сессия базы данных.
+        id_range: Диапазон идентификаторов.
+        weight_range: Диапазон веса.
+        length_range: Диапазон длины.
+        date_added_range: Диапазон дат добавления.
+        date_removed_range: Диапазон дат удаления.
+
+    Возвращает:
+        Список строк руллонов, соответствующих фильтрам.
+    """
+    stmt = _coils_statement(
+        id_range, weight_range, length_range, date_added_range, date_removed_range
+    )
+    return list(db.execute(stmt).all())
+
+
+def iter_coils(
+    db: Session,
+    id_range: Optional[Tuple[int, int]] = None,
+    weight_range: Optional[Tuple[float, float]] = None,
+    length_range: Optional[Tuple[float, float]] = None,
+    date_added_range: Optional[Tuple[datetime, datetime]] = None,
+    date_removed_range: Optional[Tuple[datetime, datetime]] = None,
+    batch_size: int = 1000,
+) -> Iterator[Sequence[RowMapping]]:
+    """Выдаёт руллоны с фильтрацией партиями, не загружая выборку целиком.
+
+    Аргументы:
+        db: Сессия базы данных.
+        id_range: Диапазон идентификаторов.
+        weight_range: Диапазон веса.
+        length_range: Диапазон длины.
+        date_added_range: Диапазон дат добавления.
+        date_removed_range: Диапазон дат удаления.
+        batch_size: Количество руллонов в партии.
+
+    Возвращает:
+        Итератор партий руллонов в виде словарей колонок.
+    """
+    stmt = _coils_statement(
+        id_range, weight_range, length_range, date_added_range, date_removed_range
+    ).execution_options(yield_per=batch_size)
+    yield from db.execute(stmt).mappings().partitions()
+
+
+def _upsert(dialect: Dialect) -> Any:
+    """Возвращает конструктор INSERT ... ON CONFLICT для диалекта.
+
+    Аргументы:
+        dialect: Диалект базы данных.
+
+    Возвращает:
+        Функция insert диалекта PostgreSQL или SQLite.
+    """
+    if dialect.name == "postgresql":
+        return postgresql.insert
+    return sqlite.insert
+
+
+def _track_daily_stats(
+    db: Union[Session, Connection],
+    day: date,
+    added_count: int,
+    removed_count: int,
+    delta_weight: float,
+) -> None:
+    """Учитывает движение руллонов в суточной сводке.
+
+    Строка дня создаётся с остатком предыдущего дня, после чего изменение
+    остатка переносится на этот и все последующие дни. Коммит выполняет
+    вызывающая сторона.
+
+    Аргументы:
+        db: Сессия или соединение с базой данных.
+        day: День добавления или удаления.
+        added_count: Количество добавленных руллонов.
+        removed_count: Количество удалённых руллонов.
+        delta_weight: Изменение общего веса.
+    """
+    stats_model = models.DailyCoilStats
+    previous = (
+        select(stats_model)
+        .where(stats_model.day < day)
+        .order_by(stats_model.day.desc())
+        .limit(1)
+        .subquery()
+    )
+    dialect = db.dialect if isinstance(db, Connection) else db.get_bind().dialect
+    stmt = _upsert(dialect)(stats_model).values(
+        day=day,
+        added_count=added_count,
+        removed_count=removed_count,
+        delta_weight=delta_weight,
+        active_count=func.coalesce(
+            select(previous.c.active_count).scalar_subquery(), 0
+        ),
+        active_weight=func.coalesce(
+            select(previous.c.active_weight).scalar_subquery(), 0.0
+        ),
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[stats_model.day],
+        set_={
+            "added_count": stats_model.added_count + stmt.excluded.added_count,
+            "removed_count": stats_model.removed_count + stmt.excluded.removed_count,
+            "delta_weight": stats_model.delta_weight + stmt.excluded.delta_weight,
+        },
+    )
+    db.execute(stmt)
+    # Сумма float при пустом складе может отличаться от нуля на погрешность
+    # округления, поэтому вес без руллонов записывается ровно нулём.
+    active_count = stats_model.active_count + added_count - removed_count
+    db.execute(
+        update(stats_model)
+        .where(stats_model.day >= day)
+        .values(
+            active_count=active_count,
+            active_weight=case(
+                (active_count == 0, 0.0),
+                else_=stats_model.active_weight + delta_weight,
+            ),
+        )
+    )
+
+
+def _track_coil(
+    conn: Connection,
+    date_added: datetime,
+    date_removed: Optional[datetime],
+    weight: float,
+    sign: int,
+) -> None:
+    """Учитывает руллон в суточной сводке (sign=1) или отменяет учёт (sign=-1).
+
+    Аргументы:
+        conn: Соединение с базой данных.
+        date_added: Дата добавления.
+        date_removed: Дата удаления.
+        weight: Вес руллона.
+        sign: Знак изменения.
+    """
+    _track_daily_stats(conn, date_added.date(), sign, 0, sign * weight)
+    if date_removed is not None:
+        _track_daily_stats(conn, date_removed.date(), 0, sign, -sign * weight)
+
+
+# Руллоны, записанные через сессию ORM (db.add, изменение атрибутов,
+# db.delete), учитываются в сводке при flush. Запросы insert/update в
+# create_coils_bulk и remove_coil этих событий не вызывают и учитывают
+# руллоны сами.
+@event.listens_for(models.Coil, "after_insert")
+def _track_inserted_coil(mapper: Mapper, conn: Connection, target: models.Coil) -> None:
+    """Учитывает в сводке руллон, добавленный через сессию ORM.
+
+    Аргументы:
+        mapper: Маппер модели.
+        conn: Соединение, в котором выполняется flush.
+        target: Добавленный руллон.
+    """
+    _track_coil(conn, target.date_added, target.date_removed, target.weight, 1)
+
+
+@event.listens_for(models.Coil, "after_update")
+def _track_updated_coil(mapper: Mapper, conn: Connection, target: models.Coil) -> None:
+    """Переносит в сводке руллон, даты или вес которого изменились через ORM.
+
+    Аргументы:
+        mapper: Маппер модели.
+        conn: Соединение, в котором выполняется flush.
+        target: Изменённый руллон.
+    """
+    # committed_state хранит прежние значения изменённых атрибутов до конца
+    # flush; active_history в модели гарантирует, что они загружены.
+    state: InstanceState[models.Coil] = inspect(target)
+    keys = ("date_added", "date_removed", "weight")
+    if not any(key in state.committed_state for key in keys):
+        return
+    old = {key: state.committed_state.get(key, getattr(target, key)) for key in keys}
+    _track_coil(conn, old["date_added"], old["date_removed"], old["weight"], -1)
+    _track_coil(conn, target.date_added, target.date_removed, target.weight, 1)
+
+
+@event.listens_for(models.Coil, "after_delete")
+def _track_deleted_coil(mapper: Mapper, conn: Connection, target: models.Coil) -> None:
+    """Убирает из сводки руллон, удалённый из базы через сессию ORM.
+
+    Аргументы:
+        mapper: Маппер модели.
+        conn: Соединение, в котором выполняется flush.
+        target: Удалённый руллон.
+    """
+    _track_coil(conn, target.date_added, target.date_removed, target.weight, -1)
+
+
+def _coil_events() -> CompoundSelect:
+    """Строит поток событий движения руллонов по дням.
+
+    Каждое добавление даёт событие (день, +вес, +1), каждое удаление —
+    (день, -вес, -1).
+
+    Возвращает:
+        Запрос с колонками day, weight и delta.
+    """
+    return union_all(
+        select(
+            func.date(models.Coil.date_added).label("day"),
+            models.Coil.weight.label("weight"),
+            literal(1).label("delta"),
+        ),
+        select(
+            func.date(models.Coil.date_removed),
+            -models.Coil.weight,
+            literal(-1),
+        ).where(models.Coil.date_removed.isnot(None)),
+    )
+
+
+def refresh_daily_stats(db: Session) -> int:
+    """Пересобирает суточную сводку по таблице руллонов.
+
+    Используется для восстановления сводки, если руллоны изменялись в обход
+    create_coil и remove_coil.
+
+    Аргументы:
+        db: Сессия базы данных.
+
+    Возвращает:
+        Количество дней в пересобранной сводке.
+    """
+    stats_model = models.DailyCoilStats
+    events = _coil_events().subquery()
+    grouped = (
+        select(
+            events.c.day,
+            func.sum(case((events.c.delta > 0, 1), else_=0)).label("added_count"),
+            func.sum(case((events.c.delta < 0, 1), else_=0)).label("removed_count"),
+            func.sum(events.c.weight).label("delta_weight"),
+        )
+        .group_by(events.c.day)
+        .subquery()
+    )
+    active_count = func.sum(grouped.c.added_count - grouped.c.removed_count).over(
+        order_by=grouped.c.day
+    )
+    # Как и в _track_daily_stats, вес пустого склада записывается ровно нулём.
+    running = select(
+        grouped.c.day,
+        grouped.c.added_count,
+        grouped.c.removed_count,
+        grouped.c.delta_weight,
+        active_count,
+        case(
+            (active_count == 0, 0.0),
+            else_=func.sum(grouped.c.delta_weight).over(order_by=grouped.c.day),
+        ),
+    )
+    db.execute(delete(stats_model))
+    db.execute(
+        insert(stats_model).from_select(
+            [
+                "day",
+                "added_count",
+                "removed_count",
+                "delta_weight",
+                "active_count",
+                "active_weight",
+            ],
+            running,
+        )
+    )
+    db.commit()
+    return db.query(stats_model).count()
+
+
+def find_day_extremes(
+    days_stats: List[Tuple[datetime, int, float]],
+) -> Tuple[
+    Optional[datetime], Optional[datetime], Optional[datetime], Optional[datetime]
+]:
+    """Находит дни с наибольшим и наименьшим остатком за один проход.
+
+    При равенстве значений выбирается более ранний день.
+
+    Аргументы:
+        days_stats: Кортежи (день, количество руллонов, вес руллонов).
+
+    Возвращает:
+        Дни с максимальным и минимальным количеством и с максимальным и
+        минимальным весом руллонов либо четыре None для пустого списка.
+    """
+    if not days_stats:
+        return None, None, None, None
+    day, max_count, max_weight = days_stats[0]
+    min_count, min_weight = max_count, max_weight
+    day_max_count = day_min_count = day_max_weight = day_min_weight = day
+    for day, count, weight in days_stats:
+        if count > max_count:
+            max_count, day_max_count = count, day
+        elif count < min_count:
+            min_count, day_min_count = count, day
+        if weight > max_weight:
+            max_weight, day_max_weight = weight, day
+        elif weight < min_weight:
+            min_weight, day_min_weight = weight, day
+    return day_max_count, day_min_count, day_max_weight, day_min_weight
 
 
 def get_statistics(
@@ -102,101 +478,86 @@ def get_statistics(
     Returns:
         Статистика по руллонам.
     """
-    added_count = (
-        db.query(models.Coil)
-        .filter(models.Coil.date_added.between(start_date, end_date))
-        .count()
-    )
-
-    removed_count = (
-        db.query(models.Coil)
-        .filter(models.Coil.date_removed.between(start_date, end_date))
-        .count()
-    )
-
-    coils = db.query(models.Coil).filter(
-        or_(
-            models.Coil.date_added.between(start_date, end_date),
-            models.Coil.date_removed.between(start_date, end_date),
-            and_(
-                models.Coil.date_added <= end_date,
-                or_(
-                    models.Coil.date_removed >= start_date,
-                    models.Coil.date_removed.is_(None),
-                ),
+    is_added = models.Coil.date_added.between(start_date, end_date)
+    is_removed = models.Coil.date_removed.between(start_date, end_date)
+    is_relevant = or_(
+        is_added,
+        is_removed,
+        and_(
+            models.Coil.date_added <= end_date,
+            or_(
+                models.Coil.date_removed >= start_date,
+                models.Coil.date_removed.is_(None),
             ),
-        )
+        ),
     )
+    is_finished = and_(models.Coil.date_removed.isnot(None), is_added)
+    time_diff = models.Coil.date_removed_epoch - models.Coil.date_added_epoch
 
-    stats = coils.with_entities(
-        func.avg(models.Coil.length).label("avg_length"),
-        func.avg(models.Coil.weight).label("avg_weight"),
-        func.max(models.Coil.length).label("max_length"),
-        func.min(models.Coil.length).label("min_length"),
-        func.max(models.Coil.weight).label("max_weight"),
-        func.min(models.Coil.weight).label("min_weight"),
-        func.sum(models.Coil.weight).label("total_weight"),
-    ).first()
-
-    time_diff = (
-        db.query(
-            func.max(
-                extract("epoch", models.Coil.date_removed)
-                - extract("epoch", models.Coil.date_added)
-            ).label("max_time_diff"),
-            func.min(
-                extract("epoch", models.Coil.date_removed)
-                - extract("epoch", models.Coil.date_added)
-            ).label("min_time_diff"),
-        )
-        .filter(
-            models.Coil.date_removed.isnot(None),
-            models.Coil.date_added.between(start_date, end_date),
-        )
-        .first()
-    )
+    # Счётчики и агрегаты считаются за один проход по руллонам периода:
+    # добавленные и удалённые руллоны — подмножества руллонов периода.
+    # FILTER (WHERE ...) есть в любой поддерживаемой SQLite: RETURNING уже
+    # требует версии 3.35.
+    stats = db.execute(
+        select(
+            func.count().filter(is_added).label("added_count"),
+            func.count().filter(is_removed).label("removed_count"),
+            func.avg(models.Coil.length).label("avg_length"),
+            func.avg(models.Coil.weight).label("avg_weight"),
+            func.max(models.Coil.length).label("max_length"),
+            func.min(models.Coil.length).label("min_length"),
+            func.max(models.Coil.weight).label("max_weight"),
+            func.min(models.Coil.weight).label("min_weight"),
+            func.sum(models.Coil.weight).label("total_weight"),
+            func.max(time_diff).filter(is_finished).label("max_time_diff"),
+            func.min(time_diff).filter(is_finished).label("min_time_diff"),
+        ).where(is_relevant)
+    ).one()
+    added_count = stats.added_count
+    removed_count = stats.removed_count
 
-    days_stats: List[Dict[str, Any]] = []
+    days: List[datetime] = []
     current_date = start_date.replace(hour=0, minute=0, second=0, microsecond=0)
     while current_date <= end_date:
-        count = (
-            db.query(models.Coil)
-            .filter(
-                models.Coil.date_added <= current_date,
-                or_(
-                    models.Coil.date_removed > current_date,
-                    models.Coil.date_removed.is_(None),
-                ),
-            )
-            .count()
+        days.append(current_date)
+        current_date += timedelta(days=1)
+
+    days_stats: List[Tuple[datetime, int, float]] = []
+    if days:
+        # Кроме дней периода берётся последний день перед ним: его итог даёт
+        # остаток на начало периода.
+        stats_model = models.DailyCoilStats
+        first_day = days[0].date()
+        opening_day = (
+            select(func.max(stats_model.day))
+            .where(stats_model.day < first_day)
+            .scalar_subquery()
         )
-        weight = (
-            db.query(func.sum(models.Coil.weight))
-            .filter(
-                models.Coil.date_added <= current_date,
-                or_(
-                    models.Coil.date_removed > current_date,
-                    models.Coil.date_removed.is_(None),
-                ),
+        rows = db.execute(
+            select(
+                stats_model.day,
+                stats_model.active_count,
+                stats_model.active_weight,
             )
-            .scalar()
-        )
-        days_stats.append(
-            {
-                "date": current_date,
-                "count": count,
-                "weight": weight if weight is not None else 0.0,
-            }
-        )
-        current_date += timedelta(days=1)
+            .where(
+                stats_model.day < days[-1].date(),
+                or_(stats_model.day >= first_day, stats_model.day == opening_day),
+            )
+            .order_by(stats_model.day)
+        ).all()
 
-    if days_stats:
-        day_max_count = max(days_stats, key=lambda x: x["count"])["date"]
-        day_min_count = min(days_stats, key=lambda x: x["count"])["date"]
-        day_max_weight = max(days_stats, key=lambda x: x["weight"])["date"]
-        day_min_weight = min(days_stats, key=lambda x: x["weight"])["date"]
-    else:
-        day_max_count = day_min_count = day_max_weight = day_min_weight = None
+        # Руллон активен на начало дня, если событие произошло в один из
+        # предыдущих дней.
+        count, weight, i = 0, 0.0, 0
+        for day in days:
+            while i < len(rows) and rows[i].day < day.date():
+                count, weight = rows[i].active_count, rows[i].active_weight
+                i += 1
+            days_stats.append((day, count, weight if weight is not None else 0.0))
+
+    day_max_count, day_min_count, day_max_weight, day_min_weight = find_day_extremes(
+        days_stats
+    )
 
     if not added_count:
         return schemas.CoilStats(
@@ -217,6 +578,7 @@ def get_statistics(
             day_min_weight=None,
         )
 
+    # Разница эпох — целое число секунд, схема же объявляет float.
     return schemas.CoilStats(
         added_count=added_count or 0,
         removed_count=removed_count or 0,
@@ -227,8 +589,12 @@ def get_statistics(
         max_weight=stats.max_weight,
         min_weight=stats.min_weight,
         total_weight=stats.total_weight,
-        max_time_diff=time_diff.max_time_diff if time_diff else None,
-        min_time_diff=time_diff.min_time_diff if time_diff else None,
+        max_time_diff=float(stats.max_time_diff)
+        if stats.max_time_diff is not None
+        else None,
+        min_time_diff=float(stats.min_time_diff)
+        if stats.min_time_diff is not None
+        else None,
         day_max_count=day_max_count,
         day_min_count=day_min_count,
         day_max_weight=day_max_weight,
@@ -4,76 +4,253 @@ import sys
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 from datetime import datetime
-from typing import List, Optional
+from functools import lru_cache
+from itertools import chain
+from typing import Any, Iterator, List, Optional
 
 import uvicorn
-from fastapi import Depends, FastAPI, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import Depends, FastAPI, HTTPException, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.openapi.utils import (
+    validation_error_definition,
+    validation_error_response_definition,
+)
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy import Row
+from sqlalchemy.orm import Session, sessionmaker
 
-from app import models, schemas
-from app.db import engine, get_db
-from app.repository import CoilRepository
+from app import functions, models, schemas
+from app.db import engine, get_db, get_session_factory
 
 app = FastAPI(
     title="Metal Warehouse API",
     description="API для работы с руллонами на складе металлопроката.",
     version="1.0.0",
+    default_response_class=ORJSONResponse,
 )
 
+# Только создание недостающих таблиц. Перенос существующей схемы выполняется
+# один раз перед запуском: python -m app.cli upgrade-schema.
 models.Base.metadata.create_all(bind=engine)
 
 
-def get_repository(db: Session = Depends(get_db)) -> CoilRepository:
-    """Получает репозиторий для работы с руллонами.
+@lru_cache(maxsize=4096)
+def _parse_iso(value: str) -> datetime:
+    """Разбирает дату ISO 8601 из параметра запроса.
+
+    Пробел заменяется на «+», так как «+» смещения часового пояса приходит
+    в строке запроса декодированным в пробел; суффикс «Z» отбрасывается.
+    Результаты кэшируются: опрашивающие клиенты повторяют одни и те же даты.
 
     Аргументы:
-        db: Сессия базы данных.
+        value: Дата в формате ISO 8601.
+
+    Возвращает:
+        datetime: Разобранная дата.
+
+    Исключения:
+        ValueError: Если формат даты неверный.
+    """
+    return datetime.fromisoformat(value.replace(" ", "+", 1).rstrip("Z"))
+
+
+def parse_query_date(value: str, field: str) -> datetime:
+    """Разбирает дату из параметра запроса.
+
+    Аргументы:
+        value: Дата в формате ISO 8601.
+        field: Имя поля для сообщения об ошибке.
+
+    Возвращает:
+        datetime: Разобранная дата.
+
+    Исключения:
+        HTTPException: Если формат даты неверный (код 422).
+    """
+    try:
+        return _parse_iso(value)
+    except ValueError:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Invalid {field} format. Use ISO 8601 (e.g., '2023-01-01T00:00:00')",
+        )
+
+
+async def parse_coil_body(request: Request) -> schemas.CoilCreate:
+    """Разбирает тело запроса сразу в схему создания руллона.
+
+    model_validate_json разбирает и проверяет JSON за один проход, без
+    промежуточного словаря json.loads.
+
+    Аргументы:
+        request: Входящий запрос.
 
     Возвращает:
-        Экземпляр репозитория руллонов.
+        schemas.CoilCreate: Данные для создания руллона.
+
+    Исключения:
+        RequestValidationError: Если тело не является корректным руллоном (код 422).
     """
-    return CoilRepository(db)
+    try:
+        return schemas.CoilCreate.model_validate_json(await request.body())
+    except ValidationError as exc:
+        raise RequestValidationError(
+            [
+                {**error, "loc": ("body", *error["loc"])}
+                for error in exc.errors(include_url=False)
+            ]
+        )
+
+
+def coil_response(row: Row) -> Response:
+    """Сериализует строку RETURNING в JSON-ответ с руллоном.
 
+    Схема проверяется и сериализуется в pydantic-core, а готовые байты
+    отдаются как есть: маршруты объявляют response_model=None, и FastAPI
+    не пропускает ответ через jsonable_encoder.
 
-@app.post("/coils/", response_model=schemas.Coil)
+    Аргументы:
+        row: Строка с колонками руллона.
+
+    Возвращает:
+        Response: JSON руллона.
+    """
+    coil = schemas.Coil.model_validate(row._mapping)
+    return Response(coil.model_dump_json(), media_type="application/json")
+
+
+def stream_coils(
+    session_factory: sessionmaker[Session], **filters: Any
+) -> Iterator[bytes]:
+    """Сериализует руллоны в JSON-массив по партиям.
+
+    Тело ответа отправляется после закрытия сессии зависимости get_db,
+    поэтому генератор открывает собственную сессию и закрывает её сам.
+
+    Аргументы:
+        session_factory: Фабрика сессий базы данных.
+        filters: Фильтры functions.iter_coils.
+
+    Возвращает:
+        Итератор фрагментов JSON-массива руллонов.
+    """
+    db = session_factory()
+    try:
+        separator = b"["
+        for batch in functions.iter_coils(db, **filters):
+            coils = schemas.CoilListAdapter.validate_python(batch)
+            yield separator + schemas.CoilListJsonEncoder(coils)[1:-1]
+            separator = b","
+        yield b"[]" if separator == b"[" else b"]"
+    finally:
+        db.close()
+
+
+# Тело create_coil разбирает parse_coil_body, поэтому FastAPI не знает ни
+# схемы тела, ни ответа 422. Обе схемы строятся из моделей и встраиваются в
+# операцию целиком, без ссылок на components, которые регистрируют другие
+# маршруты.
+COIL_CREATE_BODY = {
+    "content": {
+        "application/json": {"schema": schemas.CoilCreate.model_json_schema()}
+    },
+    "required": True,
+}
+VALIDATION_ERROR_RESPONSE = {
+    "description": "Validation Error",
+    "content": {
+        "application/json": {
+            "schema": {
+                **validation_error_response_definition,
+                "properties": {
+                    "detail": {
+                        "title": "Detail",
+                        "type": "array",
+                        "items": validation_error_definition,
+                    }
+                },
+            }
+        }
+    },
+}
+
+
+@app.post(
+    "/coils/",
+    response_model=None,
+    responses={200: {"model": schemas.Coil}, 422: VALIDATION_ERROR_RESPONSE},
+    openapi_extra={"requestBody": COIL_CREATE_BODY},
+)
 def create_coil(
-    coil: schemas.CoilCreate, repo: CoilRepository = Depends(get_repository)
-) -> schemas.Coil:
+    coil: schemas.CoilCreate = Depends(parse_coil_body), db: Session = Depends(get_db)
+) -> Response:
     """Создаёт новый руллон.
 
     Аргументы:
         coil: Данные для создания руллона.
-        repo: Репозиторий руллонов.
+        db: Сессия базы данных.
 
     Возвращает:
-        Созданный руллон.
+        Response: Созданный руллон.
     """
-    return repo.create_coil(coil)
+    return coil_response(functions.create_coil(db, coil))
 
 
-@app.delete("/coils/{coil_id}", response_model=schemas.Coil)
-def remove_coil(
-    coil_id: int, repo: CoilRepository = Depends(get_repository)
-) -> schemas.Coil:
+@app.post(
+    "/coils/bulk",
+    response_model=None,
+    responses={200: {"model": List[schemas.Coil]}},
+)
+def create_coils_bulk(
+    coils: List[schemas.CoilCreate], db: Session = Depends(get_db)
+) -> Response:
+    """Создаёт несколько руллонов одним запросом.
+
+    Аргументы:
+        coils: Данные для создания руллонов.
+        db: Сессия базы данных.
+
+    Возвращает:
+        Response: JSON-массив созданных руллонов в порядке входных данных.
+    """
+    created = schemas.CoilListAdapter.validate_python(
+        [row._mapping for row in functions.create_coils_bulk(db, coils)]
+    )
+    return Response(
+        schemas.CoilListJsonEncoder(created), media_type="application/json"
+    )
+
+
+@app.delete(
+    "/coils/{coil_id}",
+    response_model=None,
+    responses={200: {"model": schemas.Coil}},
+)
+def remove_coil(coil_id: int, db: Session = Depends(get_db)) -> Response:
     """Удаляет руллон по его ID.
 
     Аргументы:
         coil_id: Идентификатор руллон.
-        repo: Репозиторий руллонов.
+        db: Сессия базы данных.
 
     Возвращает:
-        Удалённый руллон.
+        Response: Удалённый руллон.
 
     Исключения:
         HTTPException: Если руллон не найден или уже удален (404).
     """
-    coil = repo.remove_coil(coil_id)
+    coil = functions.remove_coil(db, coil_id)
     if not coil:
         raise HTTPException(status_code=404, detail="Coil not found or already removed")
-    return coil
+    return coil_response(coil)
 
 
-@app.get("/coils/", response_model=List[schemas.Coil])
+@app.get(
+    "/coils/",
+    response_model=None,
+    responses={200: {"model": List[schemas.Coil]}},
+)
 def get_coils(
     id_min: Optional[int] = None,
     id_max: Optional[int] = None,
@@ -85,8 +262,8 @@ def get_coils(
     date_added_max: Optional[str] = None,
     date_removed_min: Optional[str] = None,
     date_removed_max: Optional[str] = None,
-    repo: CoilRepository = Depends(get_repository),
-) -> List[schemas.Coil]:
+    session_factory: sessionmaker[Session] = Depends(get_session_factory),
+) -> StreamingResponse:
     """Получает список руллонов с фильтрацией по заданным параметрам.
 
     Аргументы:
@@ -100,10 +277,10 @@ def get_coils(
         date_added_max: Максимальная дата добавления в формате ISO 8601.
         date_removed_min: Минимальная дата удаления в формате ISO 8601.
         date_removed_max: Максимальная дата удаления в формате ISO 8601.
-        repo (CoilRepository): Репозиторий для операций с руллонами.
+        session_factory: Фабрика сессий базы данных для потока ответа.
 
     Возвращает:
-        List[schemas.Coil]: Список руллонов, соответствующих фильтрам.
+        StreamingResponse: JSON-массив руллонов, соответствующих фильтрам.
 
     Исключения:
         HTTPException: Если формат даты неверный (код 422).
@@ -122,70 +299,65 @@ def get_coils(
 
     date_added_range = None
     if date_added_min is not None and date_added_max is not None:
-        try:
-            start = datetime.fromisoformat(date_added_min.replace(" ", "+", 1))
-            end = datetime.fromisoformat(date_added_max.replace(" ", "+", 1))
-            date_added_range = (start, end)
-        except ValueError:
-            raise HTTPException(
-                status_code=422,
-                detail="Invalid date_added format. Use ISO 8601 (e.g., '2023-01-01T00:00:00')",
-            )
+        date_added_range = (
+            parse_query_date(date_added_min, "date_added"),
+            parse_query_date(date_added_max, "date_added"),
+        )
 
     date_removed_range = None
     if date_removed_min is not None and date_removed_max is not None:
-        try:
-            start = datetime.fromisoformat(date_removed_min.replace(" ", "+", 1))
-            end = datetime.fromisoformat(date_removed_max.replace(" ", "+", 1))
-            date_removed_range = (start, end)
-        except ValueError:
-            raise HTTPException(
-                status_code=422,
-                detail="Invalid date_removed format. Use ISO 8601 (e.g., '2023-01-01T00:00:00')",
-            )
-
-    coils = repo.get_coils(
+        date_removed_range = (
+            parse_query_date(date_removed_min, "date_removed"),
+            parse_query_date(date_removed_max, "date_removed"),
+        )
+
+    chunks = stream_coils(
+        session_factory,
         id_range=id_range,
         weight_range=weight_range,
         length_range=length_range,
         date_added_range=date_added_range,
         date_removed_range=date_removed_range,
     )
-    return [schemas.Coil.model_validate(coil) for coil in coils]
+    # Первая партия читается до отправки заголовков: ошибка запроса к базе
+    # вернёт код 500, а не обрезанный JSON-массив с кодом 200.
+    first_chunk = next(chunks)
+    return StreamingResponse(
+        chain([first_chunk], chunks), media_type="application/json"
+    )
 
 
-@app.get("/statistics/", response_model=schemas.CoilStats)
+@app.get(
+    "/statistics/",
+    response_model=None,
+    responses={200: {"model": schemas.CoilStats}},
+)
 def get_statistics(
-    start_date: str, end_date: str, repo: CoilRepository = Depends(get_repository)
-) -> schemas.CoilStats:
+    start_date: str, end_date: str, db: Session = Depends(get_db)
+) -> ORJSONResponse:
     """Вычисляет статистику по руллонам за заданный период.
 
+    Словарь статистики содержит только числа и даты, поэтому передаётся
+    orjson напрямую, минуя jsonable_encoder.
+
     Аргументы:
         start_date: Начальная дата периода в формате ISO 8601.
         end_date: Конечная дата периода в формате ISO 8601.
-        repo: Репозиторий для операций с руллонами.
+        db: Сессия базы данных.
 
     Возвращает:
-        schemas.CoilStats: Объект статистики с данными о руллонах.
+        ORJSONResponse: Статистика с данными о руллонах (schemas.CoilStats).
 
     Исключения:
         HTTPException: Если формат даты неверный (код 422) или start_date > end_date (код 400).
     """
-    try:
-        start_date_fixed = (
-            start_date.replace(" ", "+", 1) if " " in start_date else start_date
-        )
-        end_date_fixed = end_date.replace(" ", "+", 1) if " " in end_date else end_date
-        start = datetime.fromisoformat(start_date_fixed.rstrip("Z"))
-        end = datetime.fromisoformat(end_date_fixed.rstrip("Z"))
-    except ValueError as e:
-        raise HTTPException(status_code=422, detail=f"Invalid date format: {str(e)}")
-
+    start = parse_query_date(start_date, "date")
+    end = parse_query_date(end_date, "date")
     if start > end:
         raise HTTPException(
             status_code=400, detail="Start date must be before end date"
         )
-    return repo.get_statistics(start, end)
+    return ORJSONResponse(functions.get_statistics(db, start, end))
 
 
 # Запуск приложения через uvicorn
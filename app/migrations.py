@@ -0,0 +1,97 @@
+from sqlalchemy import Connection, Engine, column, func, inspect, select, table, text
+from sqlalchemy.orm import Session
+from sqlalchemy.schema import CreateColumn
+
+from app import functions, models
+
+
+def _rebuild_sqlite_table(conn: Connection, existing: set[str]) -> None:
+    """Пересоздаёт таблицу coils в SQLite по текущей модели.
+
+    SQLite не умеет добавлять хранимые вычисляемые столбцы через ALTER
+    TABLE, поэтому таблица переименовывается, создаётся заново и данные
+    копируются в неё; вычисляемые столбцы база заполняет при копировании.
+
+    Аргументы:
+        conn: Соединение с открытой транзакцией.
+        existing: Имена столбцов в существующей таблице.
+    """
+    coils = models.Coil.__table__
+    old_name = f"{coils.name}_old"
+    # Имена индексов в SQLite общие для схемы: старые индексы мешали бы
+    # создать индексы новой таблицы.
+    for index in inspect(conn).get_indexes(coils.name):
+        conn.execute(text(f'DROP INDEX "{index["name"]}"'))
+    conn.execute(text(f'ALTER TABLE "{coils.name}" RENAME TO "{old_name}"'))
+    coils.create(conn)
+    copied = [c.name for c in coils.c if c.name in existing and not c.computed]
+    old = table(old_name, *[column(name) for name in copied])
+    conn.execute(coils.insert().from_select(copied, select(*old.c)))
+    conn.execute(text(f'DROP TABLE "{old_name}"'))
+
+
+def _check_date_added(conn: Connection) -> None:
+    """Проверяет, что у всех руллонов есть дата добавления.
+
+    Столбец date_added_epoch, как и date_added в модели, не допускает NULL,
+    а по руллону без даты добавления нельзя вычислить ни его, ни суточную
+    сводку. Такие руллоны нужно исправить до переноса.
+
+    Аргументы:
+        conn: Соединение с открытой транзакцией.
+
+    Исключения:
+        RuntimeError: Если есть руллоны без даты добавления.
+    """
+    undated = conn.scalar(
+        select(func.count())
+        .select_from(table(models.Coil.__tablename__))
+        .where(column("date_added").is_(None))
+    )
+    if undated:
+        raise RuntimeError(
+            f"Cannot upgrade the coils table: {undated} coils have no date_added. "
+            "Set date_added for them and run the upgrade again."
+        )
+
+
+def upgrade_schema(engine: Engine) -> None:
+    """Приводит схему базы данных к текущим моделям.
+
+    Создаёт недостающие таблицы, а в существующую таблицу coils добавляет
+    столбцы дат в UNIX-времени и индексы, которых create_all не добавляет.
+    Значения новых столбцов база вычисляет по уже сохранённым датам.
+    Пустая суточная сводка при непустой таблице руллонов (сводка только
+    что создана) собирается заново по руллонам.
+
+    Перенос выполняется один раз перед запуском приложения (команда
+    upgrade-schema в app.cli), а не при импорте app.main: иначе его
+    одновременно запускал бы каждый процесс-обработчик.
+
+    Аргументы:
+        engine: Движок базы данных.
+
+    Исключения:
+        RuntimeError: Если в переносимой таблице есть руллоны без даты добавления.
+    """
+    models.Base.metadata.create_all(bind=engine)
+    coils = models.Coil.__table__
+    with engine.begin() as conn:
+        existing = {c["name"] for c in inspect(conn).get_columns(coils.name)}
+        missing = [c for c in coils.c if c.name not in existing]
+        if missing:
+            _check_date_added(conn)
+        if missing and conn.dialect.name == "sqlite":
+            _rebuild_sqlite_table(conn, existing)
+        else:
+            for new_column in missing:
+                ddl = CreateColumn(new_column).compile(dialect=conn.dialect)
+                conn.execute(text(f'ALTER TABLE "{coils.name}" ADD COLUMN {ddl}'))
+            for index in coils.indexes:
+                index.create(conn, checkfirst=True)
+
+    with Session(engine) as db:
+        has_stats = db.scalar(select(models.DailyCoilStats.day).limit(1)) is not None
+        has_coils = db.scalar(select(models.Coil.id).limit(1)) is not None
+        if has_coils and not has_stats:
+            functions.refresh_daily_stats(db)
@@ -1,10 +1,52 @@
-from datetime import UTC, datetime
+from datetime import UTC, date, datetime
+from typing import Any, Optional
 
-from sqlalchemy import Column, DateTime, Float, Integer
+from sqlalchemy import BigInteger, Computed, Date, DateTime, Float, Index, Integer, column
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.sql.compiler import SQLCompiler
+from sqlalchemy.sql.functions import FunctionElement
 
 from app.db import Base
 
 
+class UnixEpoch(FunctionElement[int]):
+    """Дата в целых секундах UNIX-времени, вычисляемая базой данных.
+
+    Даты хранятся без часового пояса и считаются датами в UTC.
+    """
+    type = BigInteger()
+    inherit_cache = True
+
+
+@compiles(UnixEpoch, "sqlite")
+def _unix_epoch_sqlite(element: UnixEpoch, compiler: SQLCompiler, **kw: Any) -> str:
+    """Компилирует UnixEpoch для SQLite через strftime('%s', ...).
+
+    Аргументы:
+        element: Выражение UnixEpoch.
+        compiler: Компилятор SQL диалекта.
+
+    Возвращает:
+        str: SQL-выражение.
+    """
+    return f"CAST(strftime('%s', {compiler.process(element.clauses, **kw)}) AS INTEGER)"
+
+
+@compiles(UnixEpoch)
+def _unix_epoch_default(element: UnixEpoch, compiler: SQLCompiler, **kw: Any) -> str:
+    """Компилирует UnixEpoch через EXTRACT(EPOCH FROM ...) (PostgreSQL).
+
+    Аргументы:
+        element: Выражение UnixEpoch.
+        compiler: Компилятор SQL диалекта.
+
+    Возвращает:
+        str: SQL-выражение.
+    """
+    return f"CAST(FLOOR(EXTRACT(EPOCH FROM {compiler.process(element.clauses, **kw)})) AS BIGINT)"
+
+
 class Coil(Base):
     """Модель руллона в базе данных.
 
@@ -14,10 +56,62 @@ class Coil(Base):
         weight (float): Вес руллона.
         date_added (datetime): Дата добавления.
         date_removed (datetime, optional): Дата удаления.
+        date_added_epoch (int): Дата добавления в секундах UNIX-времени.
+        date_removed_epoch (int, optional): Дата удаления в секундах UNIX-времени.
     """
     __tablename__ = "coils"
-    id = Column(Integer, primary_key=True, index=True)
-    length = Column(Float, nullable=False)
-    weight = Column(Float, nullable=False)
-    date_added = Column(DateTime, default=datetime.now(UTC))
-    date_removed = Column(DateTime, nullable=True)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    length: Mapped[float] = mapped_column(Float, nullable=False)
+    # active_history: при изменении атрибута ORM загружает прежнее значение,
+    # даже если объект истёк после commit; по нему суточная сводка убирает
+    # старое состояние руллона.
+    weight: Mapped[float] = mapped_column(Float, nullable=False, active_history=True)
+    date_added: Mapped[datetime] = mapped_column(
+        DateTime, default=datetime.now(UTC), active_history=True
+    )
+    date_removed: Mapped[Optional[datetime]] = mapped_column(
+        DateTime, nullable=True, active_history=True
+    )
+    # Копии дат в UNIX-времени: разности и сравнения по ним целочисленные.
+    # Это хранимые вычисляемые столбцы, база обновляет их при любой записи
+    # дат, в том числе массовыми INSERT и UPDATE в обход ORM.
+    date_added_epoch: Mapped[int] = mapped_column(
+        BigInteger, Computed(UnixEpoch(column("date_added")), persisted=True), nullable=False
+    )
+    date_removed_epoch: Mapped[Optional[int]] = mapped_column(
+        BigInteger, Computed(UnixEpoch(column("date_removed")), persisted=True), nullable=True
+    )
+
+    # Частичный индекс покрывает руллоны, которые ещё на складе.
+    __table_args__ = (
+        Index("ix_coils_added_removed", "date_added", "date_removed"),
+        Index(
+            "ix_coils_active",
+            "date_added",
+            postgresql_where=date_removed.is_(None),
+            sqlite_where=date_removed.is_(None),
+        ),
+    )
+
+
+class DailyCoilStats(Base):
+    """Суточная сводка движения руллонов.
+
+    Обновляется при добавлении и удалении руллонов и позволяет считать
+    статистику по дням без обхода всей таблицы coils.
+
+    Атрибуты:
+        day (date): День.
+        added_count (int): Количество руллонов, добавленных за день.
+        removed_count (int): Количество руллонов, удалённых за день.
+        delta_weight (float): Изменение общего веса за день.
+        active_count (int): Количество руллонов на складе на конец дня.
+        active_weight (float): Общий вес руллонов на складе на конец дня.
+    """
+    __tablename__ = "daily_coil_stats"
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    added_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    removed_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    delta_weight: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    active_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    active_weight: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
@@ -1,43 +1,46 @@
-from abc import ABC, abstractmethod
+from dataclasses import dataclass
 from datetime import UTC, datetime, timedelta
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 
-from app import models, schemas
+from sqlalchemy import Row
+from sqlalchemy.orm import Session
 
+from app import functions, models, schemas
 
-class CoilRepository(ABC):
-    """Абстрактный базовый класс для репозитория руллонов.
 
-    Определяет интерфейс для операций с руллонами.
+@dataclass
+class CoilRepository:
+    """Репозиторий руллонов в базе данных через SQLAlchemy.
+
+    Тонкая обёртка над функциями app.functions, привязанная к сессии.
+
+    Атрибуты:
+        db (Session): Сессия базы данных.
     """
-    @abstractmethod
-    def create_coil(self, coil: schemas.CoilCreate) -> models.Coil:
+    db: Session
+
+    def create_coil(self, coil: schemas.CoilCreate) -> Row:
         """Создаёт новый руллон.
 
         Аргументы:
             coil (schemas.CoilCreate): Данные для создания руллона.
 
         Возвращает:
-            models.Coil: Созданный руллона.
+            Row: Созданный руллон.
         """
-        pass
+        return functions.create_coil(self.db, coil)
 
-    @abstractmethod
-    def remove_coil(
-        self, coil_id: int, date_removed: Optional[datetime] = None
-    ) -> Optional[models.Coil]:
+    def remove_coil(self, coil_id: int) -> Optional[Row]:
         """Удаляет руллон по его идентификатору.
 
         Аргументы:
             coil_id (int): Уникальный идентификатор руллона.
-            date_removed (Optional[datetime]): Дата удаления (по умолчанию текущая).
 
         Возвращает:
-            Optional[models.Coil]: Удалённый руллон или None.
+            Optional[Row]: Удалённый руллон или None.
         """
-        pass
+        return functions.remove_coil(self.db, coil_id)
 
-    @abstractmethod
     def get_coils(
         self,
         id_range: Optional[Tuple[int, int]] = None,
@@ -45,7 +48,7 @@ class CoilRepository(ABC):
         length_range: Optional[Tuple[float, float]] = None,
         date_added_range: Optional[Tuple[datetime, datetime]] = None,
         date_removed_range: Optional[Tuple[datetime, datetime]] = None,
-    ) -> List[models.Coil]:
+    ) -> List[Row]:
         """Получает список руллонов с фильтрацией.
 
         Аргументы:
@@ -56,23 +59,39 @@ class CoilRepository(ABC):
             date_removed_range (Optional[Tuple[datetime, datetime]]): Диапазон дат удаления.
 
         Возвращает:
-            List[models.Coil]: Список руллонов, соответствующих фильтрам.
+            List[Row]: Список руллонов, соответствующих фильтрам.
         """
-        pass
+        return functions.get_coils(
+            self.db,
+            id_range=id_range,
+            weight_range=weight_range,
+            length_range=length_range,
+            date_added_range=date_added_range,
+            date_removed_range=date_removed_range,
+        )
 
-    @abstractmethod
     def get_statistics(
         self, start_date: datetime, end_date: datetime
     ) -> schemas.CoilStats:
-        pass
+        """Вычисляет статистику по руллонам за период.
 
+        Аргументы:
+            start_date (datetime): Начальная дата периода.
+            end_date (datetime): Конечная дата периода.
 
-class InMemoryCoilRepository(CoilRepository):
+        Возвращает:
+            schemas.CoilStats: Словарь статистики по руллонам.
+        """
+        return functions.get_statistics(self.db, start_date, end_date)
+
+
+class InMemoryCoilRepository:
     """Репозиторий руллонов в памяти для тестирования или локального использования."""
 
     def __init__(self) -> None:
         """Инициализирует репозиторий с пустым списком руллонов."""
         self.coils: List[models.Coil] = []
+        self._coils_by_id: Dict[int, models.Coil] = {}
         self._next_id = 1
 
     def create_coil(self, coil: schemas.CoilCreate) -> models.Coil:
@@ -93,6 +112,7 @@ class InMemoryCoilRepository(CoilRepository):
         )
         self._next_id += 1
         self.coils.append(db_coil)
+        self._coils_by_id[db_coil.id] = db_coil
         return db_coil
 
     def remove_coil(
@@ -107,13 +127,11 @@ class InMemoryCoilRepository(CoilRepository):
         Возвращает:
             Optional[models.Coil]: Удалённый руллон или None, если не найдена.
         """
-        for coil in self.coils:
-            if coil.id == coil_id and coil.date_removed is None:
-                coil.date_removed = (
-                    date_removed if date_removed is not None else datetime.now(UTC)
-                )
-                return coil
-        return None
+        coil = self._coils_by_id.get(coil_id)
+        if coil is None or coil.date_removed is not None:
+            return None
+        coil.date_removed = date_removed if date_removed is not None else datetime.now(UTC)
+        return coil
 
     def get_coils(
         self,
@@ -135,26 +153,25 @@ class InMemoryCoilRepository(CoilRepository):
         Возвращает:
             List[models.Coil]: Список руллонов, соответствующих фильтрам.
         """
-        result = self.coils
-        if id_range:
-            result = [c for c in result if id_range[0] <= c.id <= id_range[1]]
-        if weight_range:
-            result = [c for c in result if weight_range[0] <= c.weight <= weight_range[1]]
-        if length_range:
-            result = [c for c in result if length_range[0] <= c.length <= length_range[1]]
-        if date_added_range:
-            result = [
-                c
-                for c in result
-                if date_added_range[0] <= c.date_added <= date_added_range[1]
-            ]
-        if date_removed_range:
-            result = [
-                c
-                for c in result
-                if c.date_removed
+        # Все фильтры проверяются за один проход по руллонам.
+        result = []
+        for c in self.coils:
+            if id_range and not id_range[0] <= c.id <= id_range[1]:
+                continue
+            if weight_range and not weight_range[0] <= c.weight <= weight_range[1]:
+                continue
+            if length_range and not length_range[0] <= c.length <= length_range[1]:
+                continue
+            if date_added_range and not (
+                date_added_range[0] <= c.date_added <= date_added_range[1]
+            ):
+                continue
+            if date_removed_range and not (
+                c.date_removed
                 and date_removed_range[0] <= c.date_removed <= date_removed_range[1]
-            ]
+            ):
+                continue
+            result.append(c)
         return result
 
     def get_statistics(
@@ -167,12 +184,20 @@ class InMemoryCoilRepository(CoilRepository):
             end_date (datetime): Конечная дата периода.
 
         Возвращает:
-            schemas.CoilStats: Объект статистики по руллонам.
+            schemas.CoilStats: Словарь статистики по руллонам.
         """
-        relevant_coils = [
-            c
-            for c in self.coils
-            if (
+        # Счётчики и агрегаты накапливаются за один проход по руллонам.
+        added_count = removed_count = relevant_count = 0
+        total_length = total_weight = 0.0
+        max_length = min_length = max_weight = min_weight = 0.0
+        max_time_diff: Optional[float] = None
+        min_time_diff: Optional[float] = None
+        for c in self.coils:
+            if start_date <= c.date_added <= end_date:
+                added_count += 1
+            if c.date_removed and start_date <= c.date_removed <= end_date:
+                removed_count += 1
+            if not (
                 (c.date_added >= start_date and c.date_added <= end_date)
                 or (
                     c.date_removed
@@ -183,20 +208,28 @@ class InMemoryCoilRepository(CoilRepository):
                     c.date_added <= end_date
                     and (c.date_removed is None or c.date_removed >= start_date)
                 )
-            )
-        ]
-        added_count = len(
-            [c for c in self.coils if start_date <= c.date_added <= end_date]
-        )
-        removed_count = len(
-            [
-                c
-                for c in self.coils
-                if c.date_removed and start_date <= c.date_removed <= end_date
-            ]
-        )
-
-        if not relevant_coils:
+            ):
+                continue
+            if relevant_count == 0:
+                max_length = min_length = c.length
+                max_weight = min_weight = c.weight
+            else:
+                max_length = max(max_length, c.length)
+                min_length = min(min_length, c.length)
+                max_weight = max(max_weight, c.weight)
+                min_weight = min(min_weight, c.weight)
+            relevant_count += 1
+            total_length += c.length
+            total_weight += c.weight
+            if c.date_removed is not None:
+                time_diff = (c.date_removed - c.date_added).total_seconds()
+                if max_time_diff is None or min_time_diff is None:
+                    max_time_diff = min_time_diff = time_diff
+                else:
+                    max_time_diff = max(max_time_diff, time_diff)
+                    min_time_diff = min(min_time_diff, time_diff)
+
+        if not relevant_count:
             return schemas.CoilStats(
                 added_count=added_count,
                 removed_count=removed_count,
@@ -215,57 +248,48 @@ class InMemoryCoilRepository(CoilRepository):
                 day_min_weight=None,
             )
 
-        lengths = [c.length for c in relevant_coils]
-        weights = [c.weight for c in relevant_coils]
-        time_diffs = [
-            (c.date_removed - c.date_added).total_seconds()
-            for c in relevant_coils
-            if c.date_removed is not None
-        ]
-
-        days_stats: List[Dict[str, Any]] = []
+        # Остатки по дням считаются проходом по отсортированным событиям:
+        # на начало дня активны руллоны, добавленные не позже этого момента
+        # и ещё не удалённые к нему.
+        additions = sorted((c.date_added, c.weight) for c in self.coils)
+        removals = sorted(
+            (c.date_removed, c.weight) for c in self.coils if c.date_removed is not None
+        )
+        days_stats: List[Tuple[datetime, int, float]] = []
+        count, weight, i, j = 0, 0.0, 0, 0
         current_date = start_date.replace(hour=0, minute=0, second=0, microsecond=0)
         while current_date <= end_date:
-            active_coils = [
-                c
-                for c in self.coils
-                if c.date_added <= current_date
-                and (c.date_removed is None or c.date_removed > current_date)
-            ]
-            days_stats.append(
-                {
-                    "date": current_date,
-                    "count": len(active_coils),
-                    "weight": sum(c.weight for c in active_coils),
-                }
-            )
+            while i < len(additions) and additions[i][0] <= current_date:
+                count += 1
+                weight += additions[i][1]
+                i += 1
+            while j < len(removals) and removals[j][0] <= current_date:
+                count -= 1
+                weight -= removals[j][1]
+                j += 1
+            # Как и в суточной сводке базы, вес пустого склада ровно нулевой:
+            # погрешность сумм float не переносится через пустой день.
+            if count == 0:
+                weight = 0.0
+            days_stats.append((current_date, count, weight))
             current_date += timedelta(days=1)
 
-        day_max_count = (
-            max(days_stats, key=lambda x: x["count"])["date"] if days_stats else None
-        )
-        day_min_count = (
-            min(days_stats, key=lambda x: x["count"])["date"] if days_stats else None
-        )
-        day_max_weight = (
-            max(days_stats, key=lambda x: x["weight"])["date"] if days_stats else None
-        )
-        day_min_weight = (
-            min(days_stats, key=lambda x: x["weight"])["date"] if days_stats else None
+        day_max_count, day_min_count, day_max_weight, day_min_weight = (
+            functions.find_day_extremes(days_stats)
         )
 
         return schemas.CoilStats(
             added_count=added_count,
             removed_count=removed_count,
-            avg_length=sum(lengths) / len(lengths),
-            avg_weight=sum(weights) / len(weights),
-            max_length=max(lengths),
-            min_length=min(lengths),
-            max_weight=max(weights),
-            min_weight=min(weights),
-            total_weight=sum(weights),
-            max_time_diff=max(time_diffs) if time_diffs else None,
-            min_time_diff=min(time_diffs) if time_diffs else None,
+            avg_length=total_length / relevant_count,
+            avg_weight=total_weight / relevant_count,
+            max_length=max_length,
+            min_length=min_length,
+            max_weight=max_weight,
+            min_weight=min_weight,
+            total_weight=total_weight,
+            max_time_diff=max_time_diff,
+            min_time_diff=min_time_diff,
             day_max_count=day_max_count,
             day_min_count=day_min_count,
             day_max_weight=day_max_weight,
@@ -1,7 +1,9 @@
 from datetime import datetime
-from typing import Optional
+from typing import Annotated, List, Optional
 
-from pydantic import BaseModel, ConfigDict, Field
+from annotated_types import Gt
+from pydantic import BaseModel, ConfigDict, TypeAdapter
+from typing_extensions import TypedDict
 
 
 class CoilBase(BaseModel):
@@ -11,8 +13,8 @@ class CoilBase(BaseModel):
         length (float): Длина руллона (>0).
         weight (float): Вес руллона (>0).
     """
-    length: float = Field(gt=0)
-    weight: float = Field(gt=0)
+    length: Annotated[float, Gt(0)]
+    weight: Annotated[float, Gt(0)]
 
 
 class CoilCreate(CoilBase):
@@ -31,12 +33,15 @@ class Coil(CoilBase):
     id: int
     date_added: datetime
     date_removed: Optional[datetime] = None
-    model_config = ConfigDict(from_attributes=True)
+    model_config = ConfigDict(from_attributes=True, frozen=True)
 
 
-class CoilStats(BaseModel):
+class CoilStats(TypedDict):
     """Схема статистики по руллонам.
 
+    Словарь, а не модель: статистика только отдаётся клиенту, поэтому
+    собирается без валидации и сериализуется напрямую.
+
     Атрибуты:
         added_count: Количество добавленных руллонов за период.
         removed_count: Количество удалённых руллонов за период.
@@ -56,17 +61,22 @@ class CoilStats(BaseModel):
     """
     added_count: int
     removed_count: int
-    avg_length: Optional[float] = None
-    avg_weight: Optional[float] = None
-    max_length: Optional[float] = None
-    min_length: Optional[float] = None
-    max_weight: Optional[float] = None
-    min_weight: Optional[float] = None
-    total_weight: Optional[float] = None
-    max_time_diff: Optional[float] = None
-    min_time_diff: Optional[float] = None
-    day_max_count: Optional[datetime] = None
-    day_min_count: Optional[datetime] = None
-    day_max_weight: Optional[datetime] = None
-    day_min_weight: Optional[datetime] = None
-    model_config = ConfigDict(from_attributes=True)
+    avg_length: Optional[float]
+    avg_weight: Optional[float]
+    max_length: Optional[float]
+    min_length: Optional[float]
+    max_weight: Optional[float]
+    min_weight: Optional[float]
+    total_weight: Optional[float]
+    max_time_diff: Optional[float]
+    min_time_diff: Optional[float]
+    day_max_count: Optional[datetime]
+    day_min_count: Optional[datetime]
+    day_max_weight: Optional[datetime]
+    day_min_weight: Optional[datetime]
+
+
+# Адаптер списка руллонов строится один раз при импорте: построение схемы
+# валидации и сериализации дорогое, повторять его на каждый запрос незачем.
+CoilListAdapter = TypeAdapter(List[Coil])
+CoilListJsonEncoder = CoilListAdapter.dump_json
@@ -4,20 +4,36 @@ import httpx
 import pytest
 import pytest_asyncio
 from httpx import ASGITransport
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, insert
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
 
-from app import models, schemas
+from app import functions, models, schemas
 from app.config import settings
-from app.db import Base, get_db
+from app.db import Base, get_db, get_session_factory
 from app.main import app
 
 
+# StaticPool отдаёт всем одно соединение: база в памяти не теряется между
+# подключениями, а тесты работают внутри одной внешней транзакции.
 engine = create_engine(
-    settings.TEST_DATABASE_URL, connect_args={"check_same_thread": False}
+    settings.TEST_DATABASE_URL,
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool,
 )
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+if engine.dialect.name == "sqlite":
+    # pysqlite сам решает, когда начинать транзакцию, и ломает SAVEPOINT;
+    # управление транзакциями передаётся SQLAlchemy.
+    @event.listens_for(engine, "connect")
+    def _disable_pysqlite_transactions(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def _begin_sqlite_transaction(conn):
+        conn.exec_driver_sql("BEGIN")
+
 
 @pytest.fixture(scope="session", autouse=True)
 def setup_database():
@@ -43,13 +59,25 @@ def override_get_db():
         db.close()
 
 
+def override_get_session_factory():
+    """Переопределяет фабрику сессий для потоковых ответов.
+
+    Возвращает:
+        sessionmaker: Фабрика тестовых сессий базы данных.
+    """
+    return TestingSessionLocal
+
+
 app.dependency_overrides[get_db] = override_get_db
+app.dependency_overrides[get_session_factory] = override_get_session_factory
 
 
-@pytest_asyncio.fixture(scope="module")
+@pytest_asyncio.fixture(scope="session", loop_scope="session")
 async def client():
     """Предоставляет асинхронный HTTP-клиент для тестирования API.
 
+    Клиент и транспорт ASGI создаются один раз на всю сессию тестов.
+
     Возвращает:
         httpx.AsyncClient: Клиент для отправки запросов к приложению.
     """
@@ -59,24 +87,65 @@ async def client():
         yield c
 
 
-@pytest.fixture(scope="function")
-def db_session():
-    """Предоставляет сессию базы данных для каждого теста.
+@pytest.fixture(scope="session")
+def connection(setup_database):
+    """Открывает одно соединение с внешней транзакцией на всю сессию тестов.
+
+    Все сессии TestingSessionLocal, включая сессии запросов к API,
+    привязываются к этому соединению; их commit фиксирует лишь SAVEPOINT,
+    а внешняя транзакция откатывается после всех тестов.
+
+    Возвращает:
+        Connection: Соединение с тестовой базой данных.
+    """
+    conn = engine.connect()
+    transaction = conn.begin()
+    TestingSessionLocal.configure(bind=conn, join_transaction_mode="create_savepoint")
+    yield conn
+    transaction.rollback()
+    conn.close()
 
-    Очищает таблицу руллонов перед тестом и откатывает изменения после.
+
+@pytest.fixture(scope="session")
+def db_session(connection):
+    """Предоставляет сессию базы данных, общую для всех тестов.
 
     Возвращает:
-        Session: Сессия базы данных для теста.
+        Session: Сессия базы данных.
     """
     db = TestingSessionLocal()
-    db.query(models.Coil).delete()
-    db.commit()
     yield db
-    db.rollback()
     db.close()
 
 
-@pytest.fixture
+@pytest.fixture(autouse=True)
+def isolate_test(connection, db_session):
+    """Оборачивает каждый тест во вложенную транзакцию и откатывает её.
+
+    Откат возвращает таблицы к пустому состоянию, поэтому отдельная
+    очистка перед тестом не нужна.
+
+    Аргументы:
+        connection (Connection): Общее соединение с базой данных.
+        db_session (Session): Общая сессия базы данных.
+    """
+    savepoint = connection.begin_nested()
+    yield
+    db_session.close()
+    savepoint.rollback()
+
+
+@pytest.fixture(scope="session")
+def now():
+    """Фиксирует текущее время один раз на всю сессию тестов.
+
+    Возвращает:
+        datetime: Текущее время в UTC.
+    """
+    return datetime.now(UTC)
+
+
+@pytest.fixture(scope="session")
 def coil_create():
     """Фикстура для создания данных руллона.
 
@@ -87,11 +156,12 @@ def coil_create():
 
 
 @pytest.fixture
-def coil(db_session):
+def coil(db_session, now):
     """Фикстура для создания активной руллона в базе данных.
 
     Аргументы:
         db_session (Session): Сессия базы данных.
+        now (datetime): Зафиксированное текущее время.
 
     Возвращает:
         models.Coil: Активная руллон.
@@ -99,22 +169,21 @@ def coil(db_session):
     coil = models.Coil(
         length=10.0,
         weight=20.0,
-        date_added=datetime.now(UTC) - timedelta(days=1),
+        date_added=now - timedelta(days=1),
         date_removed=None,
     )
     db_session.add(coil)
     db_session.commit()
-    yield coil
-    db_session.query(models.Coil).filter(models.Coil.id == coil.id).delete()
-    db_session.commit()
+    return coil
 
 
 @pytest.fixture
-def removed_coil(db_session):
+def removed_coil(db_session, now):
     """Фикстура для создания удалённого руллона в базе данных.
 
     Аргументы:
         db_session (Session): Сессия базы данных.
+        now (datetime): Зафиксированное текущее время.
 
     Возвращает:
         models.Coil: Удалённый руллон.
@@ -122,64 +191,61 @@ def removed_coil(db_session):
     coil = models.Coil(
         length=15.0,
         weight=25.0,
-        date_added=datetime.now(UTC) - timedelta(days=2),
-        date_removed=datetime.now(UTC) - timedelta(hours=1),
+        date_added=now - timedelta(days=2),
+        date_removed=now - timedelta(hours=1),
     )
     db_session.add(coil)
     db_session.commit()
-    yield coil
-    db_session.query(models.Coil).filter(models.Coil.id == coil.id).delete()
-    db_session.commit()
+    return coil
 
 
-@pytest.fixture
-def date_range():
+@pytest.fixture(scope="session")
+def date_range(now):
     """Фикстура для создания диапазона дат для тестирования.
 
+    Аргументы:
+        now (datetime): Зафиксированное текущее время.
+
     Возвращает:
         dict: Словарь с начальной и конечной датами.
     """
-    now = datetime.now(UTC)
     start_date = now - timedelta(days=2)
     return {"start_date": start_date, "end_date": now}
 
 
 @pytest.fixture
-def coil_list(db_session, date_range):
+def coil_list(db_session, date_range, now):
     """Фикстура для создания списка руллонов в базе данных.
 
+    Руллоны вставляются одним INSERT ... RETURNING. Такая вставка не ведёт
+    суточную сводку, поэтому сводка затем пересобирается.
+
     Аргументы:
         db_session (Session): Сессия базы данных.
         date_range (dict): Диапазон дат для теста.
+        now (datetime): Зафиксированное текущее время.
 
     Возвращает:
         List[models.Coil]: Список созданных руллонов.
     """
     start_date = date_range["start_date"]
-    now = date_range["end_date"]
-    coils = [
-        models.Coil(
-            length=10.0,
-            weight=20.0,
-            date_added=start_date + timedelta(days=1),
-            date_removed=None,
-        ),
-        models.Coil(
-            length=15.0,
-            weight=25.0,
-            date_added=start_date,
-            date_removed=now - timedelta(hours=1),
-        ),
-    ]
-    db_session.add_all(coils)
-    db_session.commit()
-    saved_coils = db_session.query(models.Coil).all()
-    print(
-        f"Сохранённые руллоны в фикстуре: {len(saved_coils)} руллонов: "
-        f"{[{'id': c.id, 'date_added': c.date_added, 
-             'date_removed': c.date_removed} for c in saved_coils]}"
-    )
-    yield coils
-    for coil in coils:
-        db_session.query(models.Coil).filter(models.Coil.id == coil.id).delete()
-    db_session.commit()
+    removed_at = now - timedelta(hours=1)
+    coils = db_session.scalars(
+        insert(models.Coil).returning(models.Coil, sort_by_parameter_order=True),
+        [
+            {
+                "length": 10.0,
+                "weight": 20.0,
+                "date_added": start_date + timedelta(days=1),
+                "date_removed": None,
+            },
+            {
+                "length": 15.0,
+                "weight": 25.0,
+                "date_added": start_date,
+                "date_removed": removed_at,
+            },
+        ],
+    ).all()
+    functions.refresh_daily_stats(db_session)
+    return coils
@@ -1,25 +1,16 @@
-from datetime import UTC, datetime, timedelta
+import json
+from datetime import datetime, timedelta
 
 import pytest
-from httpx import AsyncClient
+from httpx import ASGITransport, AsyncClient
 from sqlalchemy.orm import Session
 
+from app import functions
 from app.main import app
 from app.models import Coil
 
 
-@pytest.fixture
-async def client():
-    """Предоставляет асинхронный клиент для тестирования API.
-
-    Yields:
-        AsyncClient: Клиент для отправки HTTP-запросов.
-    """
-    async with AsyncClient(app=app, base_url="http://test") as ac:
-        yield ac
-
-
-@pytest.mark.asyncio
+@pytest.mark.asyncio(loop_scope="session")
 async def test_create_coil(client: AsyncClient, db_session: Session):
     """Тестирует создание нового руллона через API.
 
@@ -34,15 +25,57 @@ async def test_create_coil(client: AsyncClient, db_session: Session):
     assert data["weight"] == 20.0
 
 
-@pytest.mark.asyncio
-async def test_remove_coil(client: AsyncClient, db_session: Session):
+@pytest.mark.asyncio(loop_scope="session")
+async def test_create_coil_invalid(client: AsyncClient):
+    """Тестирует отклонение некорректного тела запроса при создании руллона.
+
+    Аргументы:
+        client (AsyncClient): Асинхронный клиент для запросов.
+    """
+    response = await client.post("/coils/", json={"length": -1.0, "weight": 20.0})
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["loc"] == ["body", "length"]
+
+    response = await client.post("/coils/", content=b"{not json")
+    assert response.status_code == 422
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_create_coil_openapi(client: AsyncClient):
+    """Тестирует, что схема OpenAPI описывает тело и ошибку 422 создания руллона.
+
+    Обе схемы встроены в операцию и не ссылаются на components.
+
+    Аргументы:
+        client (AsyncClient): Асинхронный клиент для запросов.
+    """
+    response = await client.get("/openapi.json")
+    assert response.status_code == 200
+    operation = response.json()["paths"]["/coils/"]["post"]
+
+    body_schema = operation["requestBody"]["content"]["application/json"]["schema"]
+    assert body_schema["required"] == ["length", "weight"]
+    error_schema = operation["responses"]["422"]["content"]["application/json"]["schema"]
+    assert error_schema["properties"]["detail"]["items"]["required"] == [
+        "loc",
+        "msg",
+        "type",
+    ]
+    assert "$ref" not in json.dumps([body_schema, error_schema])
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_remove_coil(
+    client: AsyncClient, db_session: Session, now: datetime
+):
     """Тестирует удаление руллона через API.
 
     Аргументы:
         client (AsyncClient): Асинхронный клиент для запросов.
         db_session (Session): Сессия базы данных.
+        now (datetime): Зафиксированное текущее время сессии тестов.
     """
-    coil = Coil(length=10.0, weight=20.0, date_added=datetime.now(UTC))
+    coil = Coil(length=10.0, weight=20.0, date_added=now)
     db_session.add(coil)
     db_session.commit()
     response = await client.delete(f"/coils/{coil.id}")
@@ -50,7 +83,7 @@ async def test_remove_coil(client: AsyncClient, db_session: Session):
     assert response.json()["date_removed"] is not None
 
 
-@pytest.mark.asyncio
+@pytest.mark.asyncio(loop_scope="session")
 async def test_remove_coil_not_found(client: AsyncClient, db_session: Session):
     """Тестирует попытку удаления несуществующего руллона.
 
@@ -62,39 +95,72 @@ async def test_remove_coil_not_found(client: AsyncClient, db_session: Session):
     assert response.status_code == 404
 
 
-@pytest.mark.asyncio
-async def test_get_coils_with_all_filters(client: AsyncClient, db_session: Session):
+@pytest.mark.asyncio(loop_scope="session")
+async def test_get_coils_with_all_filters(
+    client: AsyncClient, db_session: Session, now: datetime
+):
     """Тестирует получение руллонов с полным набором фильтров.
 
     Аргументы:
         client (AsyncClient): Асинхронный клиент для запросов.
         db_session (Session): Сессия базы данных.
+        now (datetime): Зафиксированное текущее время сессии тестов.
     """
-    now = datetime.now(UTC)
     yesterday = now - timedelta(days=1)
     coil = Coil(length=10.0, weight=20.0, date_added=yesterday, date_removed=now)
     db_session.add(coil)
     db_session.commit()
     response = await client.get(
-        f"/coils/?id_min={coil.id}&id_max={coil.id}"
-        f"&weight_min=19.0&weight_max=21.0"
-        f"&length_min=9.0&length_max=11.0"
-        f"&date_added_min={yesterday.isoformat()}&date_added_max={now.isoformat()}"
-        f"&date_removed_min={yesterday.isoformat()}&date_removed_max={now.isoformat()}"
+        "/coils/",
+        params={
+            "id_min": coil.id,
+            "id_max": coil.id,
+            "weight_min": 19.0,
+            "weight_max": 21.0,
+            "length_min": 9.0,
+            "length_max": 11.0,
+            "date_added_min": yesterday.isoformat(),
+            "date_added_max": now.isoformat(),
+            "date_removed_min": yesterday.isoformat(),
+            "date_removed_max": now.isoformat(),
+        },
     )
     assert response.status_code == 200
     assert len(response.json()) == 1
 
 
-@pytest.mark.asyncio
-async def test_get_statistics_empty_db(client: AsyncClient, db_session: Session):
+@pytest.mark.asyncio(loop_scope="session")
+async def test_get_coils_query_error(monkeypatch):
+    """Тестирует, что ошибка запроса руллонов возвращает код 500.
+
+    Первая партия читается до отправки заголовков, поэтому клиент не
+    получает обрезанный JSON-массив с кодом 200.
+
+    Аргументы:
+        monkeypatch: Фикстура pytest для подмены функций.
+    """
+    def broken_iter_coils(db, **filters):
+        raise RuntimeError("database is unavailable")
+        yield
+
+    monkeypatch.setattr(functions, "iter_coils", broken_iter_coils)
+    transport = ASGITransport(app=app, raise_app_exceptions=False)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.get("/coils/")
+    assert response.status_code == 500
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_get_statistics_empty_db(
+    client: AsyncClient, db_session: Session, now: datetime
+):
     """Тестирует получение статистики при пустой базе данных.
 
     Аргументы:
         client (AsyncClient): Асинхронный клиент для запросов.
         db_session (Session): Сессия базы данных.
+        now (datetime): Зафиксированное текущее время сессии тестов.
     """
-    now = datetime.now(UTC)
     yesterday = now - timedelta(days=1)
     response = await client.get(
         f"/statistics/?start_date={yesterday.isoformat()}&end_date={now.isoformat()}"
@@ -106,15 +172,17 @@ async def test_get_statistics_empty_db(client: AsyncClient, db_session: Session)
     assert stats["avg_length"] is None
 
 
-@pytest.mark.asyncio
-async def test_get_statistics_with_data(client: AsyncClient, db_session: Session):
+@pytest.mark.asyncio(loop_scope="session")
+async def test_get_statistics_with_data(
+    client: AsyncClient, db_session: Session, now: datetime
+):
     """Тестирует получение статистики с данными в базе.
 
     Аргументы:
         client (AsyncClient): Асинхронный клиент для запросов.
         db_session (Session): Сессия базы данных.
+        now (datetime): Зафиксированное текущее время сессии тестов.
     """
-    now = datetime.now(UTC)
     yesterday = now - timedelta(days=1)
     coil = Coil(length=10.0, weight=20.0, date_added=yesterday, date_removed=now)
     db_session.add(coil)
@@ -129,7 +197,7 @@ async def test_get_statistics_with_data(client: AsyncClient, db_session: Session
     assert stats["avg_length"] == 10.0
 
 
-@pytest.mark.asyncio
+@pytest.mark.asyncio(loop_scope="session")
 async def test_get_statistics_invalid_date(client: AsyncClient):
     """Тестирует обработку неверного формата даты в запросе статистики.
 
@@ -140,3 +208,21 @@ async def test_get_statistics_invalid_date(client: AsyncClient):
         "/statistics/?start_date=invalid&end_date=2023-01-02T00:00:00"
     )
     assert response.status_code == 422
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_create_coils_bulk(client: AsyncClient, db_session: Session):
+    """Тестирует создание нескольких руллонов одним запросом через API.
+
+    Аргументы:
+        client (AsyncClient): Асинхронный клиент для запросов.
+        db_session (Session): Сессия базы данных.
+    """
+    response = await client.post(
+        "/coils/bulk",
+        json=[{"length": 10.0, "weight": 20.0}, {"length": 15.0, "weight": 25.0}],
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert [coil["length"] for coil in data] == [10.0, 15.0]
+    assert data[0]["id"] < data[1]["id"]
@@ -1,6 +1,29 @@
+from datetime import UTC, date, datetime, timedelta
+
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 
-from app import functions
+from app import functions, models, schemas
+
+
+def _epoch(value: datetime) -> int:
+    """Переводит дату, хранящуюся без часового пояса как UTC, в UNIX-время."""
+    return int(value.replace(tzinfo=UTC).timestamp())
+
+
+def test_coil_epochs_follow_dates(db_session: Session, coil_list):
+    """Тестирует, что база заполняет даты в UNIX-времени при массовой вставке.
+
+    Аргументы:
+        db_session (Session): Сессия базы данных.
+        coil_list: Фикстура со списком руллонов.
+    """
+    for coil in coil_list:
+        assert coil.date_added_epoch == _epoch(coil.date_added)
+        if coil.date_removed is None:
+            assert coil.date_removed_epoch is None
+        else:
+            assert coil.date_removed_epoch == _epoch(coil.date_removed)
 
 
 def test_create_coil(db_session: Session, coil_create):
@@ -18,6 +41,32 @@ def test_create_coil(db_session: Session, coil_create):
     assert result.date_removed is None
 
 
+def test_create_coils_bulk(db_session: Session, coil_create):
+    """Тестирует создание нескольких руллонов через функцию create_coils_bulk.
+
+    Аргументы:
+        db_session (Session): Сессия базы данных.
+        coil_create: Фикстура с данными для создания руллона.
+    """
+    other = schemas.CoilCreate(length=15.0, weight=25.0)
+    result = functions.create_coils_bulk(db_session, [coil_create, other])
+    assert [coil.length for coil in result] == [coil_create.length, other.length]
+    assert all(coil.id is not None for coil in result)
+    assert db_session.query(models.Coil).count() == 2
+    stats = db_session.query(models.DailyCoilStats).one()
+    assert stats.added_count == 2
+    assert stats.active_weight == coil_create.weight + other.weight
+
+
+def test_create_coils_bulk_empty(db_session: Session):
+    """Тестирует вызов create_coils_bulk с пустым списком.
+
+    Аргументы:
+        db_session (Session): Сессия базы данных.
+    """
+    assert functions.create_coils_bulk(db_session, []) == []
+
+
 def test_remove_coil_success(db_session: Session, coil):
     """Тестирует успешное удаление руллона.
 
@@ -26,8 +75,12 @@ def test_remove_coil_success(db_session: Session, coil):
         coil: Фикстура с активным руллоном.
     """
     result = functions.remove_coil(db_session, coil.id)
-    assert result == coil
+    assert result is not None
+    assert result.id == coil.id
     assert result.date_removed is not None
+    assert coil.date_removed == result.date_removed
+    db_session.refresh(coil)
+    assert coil.date_removed_epoch == _epoch(result.date_removed)
 
 
 def test_remove_coil_not_found(db_session: Session):
@@ -103,9 +156,9 @@ def test_get_statistics_empty(db_session: Session, date_range):
     stats = functions.get_statistics(
         db_session, date_range["start_date"], date_range["end_date"]
     )
-    assert stats.added_count == 0
-    assert stats.removed_count == 0
-    assert stats.avg_length is None
+    assert stats["added_count"] == 0
+    assert stats["removed_count"] == 0
+    assert stats["avg_length"] is None
 
 
 def test_get_statistics_with_data(db_session: Session, coil_list, date_range):
@@ -119,8 +172,163 @@ def test_get_statistics_with_data(db_session: Session, coil_list, date_range):
     stats = functions.get_statistics(
         db_session, date_range["start_date"], date_range["end_date"]
     )
-    assert stats.added_count == 2
-    assert stats.removed_count == 1
-    assert stats.avg_length == 12.5
-    assert stats.avg_weight == 22.5
-    assert stats.total_weight == 45.0
+    assert stats["added_count"] == 2
+    assert stats["removed_count"] == 1
+    assert stats["avg_length"] == 12.5
+    assert stats["avg_weight"] == 22.5
+    assert stats["total_weight"] == 45.0
+    assert stats["max_time_diff"] == timedelta(days=2, hours=-1).total_seconds()
+
+
+def test_get_statistics_day_extremes_for_orm_coils(db_session: Session):
+    """Тестирует дни экстремумов для руллонов, добавленных через сессию ORM.
+
+    Аргументы:
+        db_session (Session): Сессия базы данных.
+    """
+    db_session.add_all(
+        [
+            models.Coil(
+                length=10.0,
+                weight=50.0,
+                date_added=datetime(2024, 1, 3, 10),
+                date_removed=datetime(2024, 1, 5, 10),
+            ),
+            models.Coil(length=10.0, weight=30.0, date_added=datetime(2024, 1, 4, 10)),
+            models.Coil(length=10.0, weight=5.0, date_added=datetime(2024, 1, 6, 10)),
+        ]
+    )
+    db_session.commit()
+    late = db_session.scalars(
+        select(models.Coil).where(models.Coil.weight == 5.0)
+    ).one()
+    late.date_removed = datetime(2024, 1, 8, 10)
+    db_session.commit()
+
+    # Остатки на начало дней 4-10 января: 1/50, 2/80, 1/30, 2/35, 2/35, 1/30, 1/30.
+    stats = functions.get_statistics(
+        db_session, datetime(2024, 1, 4), datetime(2024, 1, 10)
+    )
+
+    assert stats["day_max_count"] == datetime(2024, 1, 5)
+    assert stats["day_min_count"] == datetime(2024, 1, 4)
+    assert stats["day_max_weight"] == datetime(2024, 1, 5)
+    assert stats["day_min_weight"] == datetime(2024, 1, 6)
+
+
+def test_create_and_remove_coil_track_daily_stats(db_session: Session, coil_create):
+    """Тестирует обновление суточной сводки при добавлении и удалении руллона.
+
+    Аргументы:
+        db_session (Session): Сессия базы данных.
+        coil_create: Фикстура с данными для создания руллона.
+    """
+    created = functions.create_coil(db_session, coil_create)
+    removed = functions.remove_coil(db_session, created.id)
+    assert removed is not None
+
+    rows = db_session.query(models.DailyCoilStats).order_by(models.DailyCoilStats.day).all()
+    assert sum(row.added_count for row in rows) == 1
+    assert sum(row.removed_count for row in rows) == 1
+    assert rows[-1].day == removed.date_removed.date()
+    assert rows[-1].active_count == 0
+    assert rows[-1].active_weight == 0.0
+
+
+def test_refresh_daily_stats(db_session: Session, coil_list):
+    """Тестирует пересборку суточной сводки по таблице руллонов.
+
+    Аргументы:
+        db_session (Session): Сессия базы данных.
+        coil_list: Фикстура со списком руллонов.
+    """
+    days = functions.refresh_daily_stats(db_session)
+    rows = db_session.query(models.DailyCoilStats).order_by(models.DailyCoilStats.day).all()
+
+    assert days == len(rows)
+    assert sum(row.added_count for row in rows) == 2
+    assert sum(row.removed_count for row in rows) == 1
+    assert rows[-1].active_count == 1
+    assert rows[-1].active_weight == 20.0
+
+
+def test_orm_update_after_commit_tracks_daily_stats(db_session: Session):
+    """Тестирует учёт в сводке изменений руллона, истёкшего после commit.
+
+    Аргументы:
+        db_session (Session): Сессия базы данных.
+    """
+    coil = models.Coil(length=10.0, weight=5.0, date_added=datetime(2024, 1, 2, 10))
+    db_session.add(coil)
+    db_session.commit()
+
+    coil.date_removed = datetime(2024, 1, 4, 10)
+    db_session.commit()
+    coil.weight = 7.0
+    db_session.commit()
+
+    rows = db_session.execute(
+        select(
+            models.DailyCoilStats.day,
+            models.DailyCoilStats.added_count,
+            models.DailyCoilStats.removed_count,
+            models.DailyCoilStats.active_count,
+            models.DailyCoilStats.active_weight,
+        ).order_by(models.DailyCoilStats.day)
+    ).all()
+    assert [tuple(row) for row in rows] == [
+        (date(2024, 1, 2), 1, 0, 1, 7.0),
+        (date(2024, 1, 4), 0, 1, 0, 0.0),
+    ]
+
+
+def test_daily_stats_empty_warehouse_weight_is_zero(db_session: Session):
+    """Тестирует, что вес пустого склада в сводке равен ровно нулю.
+
+    Сумма 0.1 + 0.2 + 2.3 за вычетом тех же весов во float даёт не ноль,
+    из-за чего день без руллонов выглядел бы днём минимального веса.
+
+    Аргументы:
+        db_session (Session): Сессия базы данных.
+    """
+    db_session.add_all(
+        [
+            models.Coil(
+                length=10.0,
+                weight=weight,
+                date_added=datetime(2024, 1, 2, 10),
+                date_removed=datetime(2024, 1, 3 + i, 10),
+            )
+            for i, weight in enumerate((0.1, 0.2, 2.3))
+        ]
+    )
+    db_session.commit()
+
+    # Пересчёт при записи и полная пересборка должны давать одно и то же.
+    for rebuild in (False, True):
+        if rebuild:
+            functions.refresh_daily_stats(db_session)
+        stats = functions.get_statistics(
+            db_session, datetime(2024, 1, 1), datetime(2024, 1, 6)
+        )
+        assert stats["day_min_count"] == datetime(2024, 1, 1)
+        assert stats["day_min_weight"] == datetime(2024, 1, 1)
+        assert stats["day_max_weight"] == datetime(2024, 1, 3)
+
+
+def test_find_day_extremes():
+    """Тестирует поиск дней с наибольшим и наименьшим остатком."""
+    first = datetime(2024, 1, 1, tzinfo=UTC)
+    days_stats = [
+        (first, 1, 20.0),
+        (first + timedelta(days=1), 3, 10.0),
+        (first + timedelta(days=2), 3, 50.0),
+        (first + timedelta(days=3), 0, 0.0),
+    ]
+    assert functions.find_day_extremes(days_stats) == (
+        first + timedelta(days=1),
+        first + timedelta(days=3),
+        first + timedelta(days=2),
+        first + timedelta(days=3),
+    )
+    assert functions.find_day_extremes([]) == (None, None, None, None)
@@ -0,0 +1,92 @@
+from datetime import UTC, date, datetime
+
+import pytest
+from sqlalchemy import create_engine, inspect, select, text
+
+from app import migrations, models
+
+
+def test_upgrade_schema_adds_epoch_columns(tmp_path):
+    """Тестирует перенос старой таблицы coils и сборку суточной сводки.
+
+    Аргументы:
+        tmp_path (Path): Временный каталог для файла базы данных.
+    """
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                "CREATE TABLE coils (id INTEGER PRIMARY KEY, length FLOAT NOT NULL, "
+                "weight FLOAT NOT NULL, date_added DATETIME, date_removed DATETIME)"
+            )
+        )
+        conn.execute(text("CREATE INDEX ix_coils_id ON coils (id)"))
+        conn.execute(
+            text(
+                "INSERT INTO coils (length, weight, date_added, date_removed) VALUES "
+                "(10.0, 20.0, '2024-01-04 10:00:00.000000', NULL), "
+                "(15.0, 25.0, '2024-01-05 00:00:00.000000', '2024-01-06 12:30:00.000000')"
+            )
+        )
+
+    migrations.upgrade_schema(engine)
+
+    with engine.connect() as conn:
+        rows = conn.execute(
+            select(
+                models.Coil.id,
+                models.Coil.date_added_epoch,
+                models.Coil.date_removed_epoch,
+            ).order_by(models.Coil.id)
+        ).all()
+        indexes = {index["name"] for index in inspect(conn).get_indexes("coils")}
+        stats = conn.execute(
+            select(
+                models.DailyCoilStats.day,
+                models.DailyCoilStats.active_count,
+                models.DailyCoilStats.active_weight,
+            ).order_by(models.DailyCoilStats.day)
+        ).all()
+    engine.dispose()
+
+    assert [tuple(row) for row in rows] == [
+        (1, int(datetime(2024, 1, 4, 10, tzinfo=UTC).timestamp()), None),
+        (
+            2,
+            int(datetime(2024, 1, 5, tzinfo=UTC).timestamp()),
+            int(datetime(2024, 1, 6, 12, 30, tzinfo=UTC).timestamp()),
+        ),
+    ]
+    assert {"ix_coils_id", "ix_coils_added_removed", "ix_coils_active"} <= indexes
+    assert [tuple(row) for row in stats] == [
+        (date(2024, 1, 4), 1, 20.0),
+        (date(2024, 1, 5), 2, 45.0),
+        (date(2024, 1, 6), 1, 20.0),
+    ]
+
+
+def test_upgrade_schema_rejects_coils_without_date_added(tmp_path):
+    """Тестирует отказ переноса, если у руллона нет даты добавления.
+
+    Аргументы:
+        tmp_path (Path): Временный каталог для файла базы данных.
+    """
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                "CREATE TABLE coils (id INTEGER PRIMARY KEY, length FLOAT NOT NULL, "
+                "weight FLOAT NOT NULL, date_added DATETIME, date_removed DATETIME)"
+            )
+        )
+        conn.execute(
+            text("INSERT INTO coils (length, weight, date_added) VALUES (10.0, 20.0, NULL)")
+        )
+
+    with pytest.raises(RuntimeError, match="1 coils have no date_added"):
+        migrations.upgrade_schema(engine)
+
+    with engine.connect() as conn:
+        columns = {c["name"] for c in inspect(conn).get_columns("coils")}
+    engine.dispose()
+    assert "date_added_epoch" not in columns
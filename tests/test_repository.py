@@ -1,21 +1,102 @@
-from datetime import UTC, datetime, timedelta
-from unittest.mock import Mock
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from typing import Any, List
 
 import pytest
-from sqlalchemy.orm import Session
+from sqlalchemy import create_engine
 
 from app import models, schemas
 from app.repository import InMemoryCoilRepository, CoilRepository
 
 
+class FakeResult:
+    """Результат запроса, отдающий заранее заданные строки FakeSession."""
+
+    def __init__(self, session: "FakeSession") -> None:
+        """Связывает результат с фиктивной сессией."""
+        self.session = session
+
+    def all(self) -> List[Any]:
+        """Возвращает все заданные строки."""
+        return list(self.session.all_rows)
+
+    def first(self) -> Any:
+        """Возвращает заданную первую строку или None."""
+        return self.session.first_row
+
+    def one(self) -> Any:
+        """Возвращает заданную единственную строку."""
+        return self.session.one_row
+
+
+class FakeSession:
+    """Лёгкая замена sqlalchemy.orm.Session для тестов CoilRepository.
+
+    Запросы не выполняются: execute возвращает строки, заданные тестом,
+    а вызовы execute, commit, add и refresh подсчитываются.
+    """
+
+    # Движок нужен только ради диалекта; соединение не открывается.
+    bind = create_engine("sqlite://")
+
+    def __init__(self) -> None:
+        """Создаёт сессию без строк и с нулевыми счётчиками."""
+        self.reset()
+
+    def reset(self) -> None:
+        """Сбрасывает заданные строки и счётчики вызовов."""
+        self.all_rows: List[Any] = []
+        self.first_row: Any = None
+        self.one_row: Any = None
+        self.executed = 0
+        self.committed = 0
+        self.added: List[Any] = []
+        self.refreshed: List[Any] = []
+
+    def get_bind(self) -> Any:
+        """Возвращает движок, по которому функции определяют диалект."""
+        return self.bind
+
+    def execute(self, statement: Any, params: Any = None) -> FakeResult:
+        """Подсчитывает запрос и возвращает заданные строки."""
+        self.executed += 1
+        return FakeResult(self)
+
+    def commit(self) -> None:
+        """Подсчитывает фиксацию транзакции."""
+        self.committed += 1
+
+    def add(self, instance: Any) -> None:
+        """Запоминает добавленный объект."""
+        self.added.append(instance)
+
+    def refresh(self, instance: Any) -> None:
+        """Запоминает обновлённый объект."""
+        self.refreshed.append(instance)
+
+
+@pytest.fixture(scope="session")
+def shared_fake_session():
+    """Создаёт одну фиктивную сессию базы данных на всю сессию тестов.
+
+    Возвращает:
+        FakeSession: Фиктивная сессия.
+    """
+    return FakeSession()
+
+
 @pytest.fixture
-def mock_db_session():
-    """Предоставляет мок-объект сессии базы данных для тестирования.
+def fake_db_session(shared_fake_session):
+    """Предоставляет фиктивную сессию и сбрасывает её состояние после теста.
+
+    Аргументы:
+        shared_fake_session (FakeSession): Общая фиктивная сессия.
 
     Возвращает:
-        Mock: Мок-объект с интерфейсом sqlalchemy.orm.Session.
+        FakeSession: Фиктивная сессия базы данных.
     """
-    return Mock(spec=Session)
+    yield shared_fake_session
+    shared_fake_session.reset()
 
 
 @pytest.fixture
@@ -29,9 +110,12 @@ def coil_create():
 
 
 @pytest.fixture
-def coil():
+def coil(now):
     """Предоставляет фикстуру с объектом руллона для тестирования.
 
+    Аргументы:
+        now (datetime): Зафиксированное текущее время.
+
     Возвращает:
         models.Coil: Тестовый объект руллона с заданными параметрами.
     """
@@ -39,116 +123,105 @@ def coil():
         id=1,
         length=10.0,
         weight=20.0,
-        date_added=datetime.now(UTC) - timedelta(days=1),
+        date_added=now - timedelta(days=1),
         date_removed=None,
     )
 
-def test_sqlalchemy_create_coil(mock_db_session, coil_create):
+def test_sqlalchemy_create_coil(fake_db_session, coil_create, now):
     """Тестирует создание руллона в репозитории CoilRepository.
 
     Аргументы:
-        mock_db_session (Mock): Мок-объект сессии базы данных.
+        fake_db_session (FakeSession): Фиктивная сессия базы данных.
         coil_create (schemas.CoilCreate): Данные для создания руллона.
+        now (datetime): Зафиксированное текущее время.
     """
-    repo = CoilRepository(mock_db_session)
+    repo = CoilRepository(fake_db_session)
     mock_coil = models.Coil(
-        id=1, length=coil_create.length, weight=coil_create.weight, date_added=datetime.now(UTC)
+        id=1, length=coil_create.length, weight=coil_create.weight, date_added=now
     )
 
-    # Мокируем поведение базы данных
-    mock_db_session.add.return_value = None
-    mock_db_session.commit.return_value = None
-    mock_db_session.refresh.side_effect = lambda x: setattr(x, "id", 1)
-
-    # Устанавливаем, что add добавляет mock_coil
-    def mock_add(coil):
-        coil.id = 1 
-        return None
-
-    mock_db_session.add.side_effect = mock_add
+    # INSERT ... RETURNING возвращает созданную строку
+    fake_db_session.all_rows = [mock_coil]
     result = repo.create_coil(coil_create)
 
     # Проверяем, что результат соответствует mock_coil
     assert result.length == mock_coil.length
     assert result.weight == mock_coil.weight
     assert result.id == mock_coil.id
-    mock_db_session.add.assert_called_once()
-    mock_db_session.commit.assert_called_once()
-    mock_db_session.refresh.assert_called_once()
+    assert fake_db_session.added == []
+    assert fake_db_session.committed == 1
+    assert fake_db_session.refreshed == []
 
 
-def test_sqlalchemy_remove_coil(mock_db_session, coil):
-    """Тестирует удаление существующего руллона в репозитории SQLAlchemyCoilRepository.
+def test_sqlalchemy_remove_coil(fake_db_session, coil, now):
+    """Тестирует удаление существующего руллона в репозитории CoilRepository.
 
     Аргументы:
-        mock_db_session (Mock): Мок-объект сессии базы данных.
+        fake_db_session (FakeSession): Фиктивная сессия базы данных.
         coil (models.Coil): Тестовый объект руллона.
+        now (datetime): Зафиксированное текущее время.
     """
-    repo = CoilRepository(mock_db_session)
-    mock_db_session.query.return_value.filter.return_value.first.return_value = coil
+    repo = CoilRepository(fake_db_session)
+    coil.date_removed = now
+    fake_db_session.first_row = coil
 
     result = repo.remove_coil(coil.id)
 
     assert result == coil
     assert result.date_removed is not None
-    mock_db_session.commit.assert_called_once()
-    mock_db_session.refresh.assert_called_once_with(coil)
+    assert fake_db_session.committed == 1
+    assert fake_db_session.refreshed == []
 
 
-def test_sqlalchemy_remove_coil_not_found(mock_db_session):
+def test_sqlalchemy_remove_coil_not_found(fake_db_session):
     """Тестирует попытку удаления несуществующего руллона в CoilRepository.
 
     Аргументы:
-        mock_db_session (Mock): Мок-объект сессии базы данных.
+        fake_db_session (FakeSession): Фиктивная сессия базы данных.
     """
-    repo = CoilRepository(mock_db_session)
-    mock_db_session.query.return_value.filter.return_value.first.return_value = None
+    repo = CoilRepository(fake_db_session)
+    fake_db_session.first_row = None
 
     result = repo.remove_coil(999)
 
     assert result is None
-    mock_db_session.commit.assert_not_called()
+    assert fake_db_session.committed == 0
 
 
-def test_sqlalchemy_get_coils_empty(mock_db_session):
-    """Тестирует получение пустого списка руллонов в SQLAlchemyCoilRepository.
+def test_sqlalchemy_get_coils_empty(fake_db_session):
+    """Тестирует получение пустого списка руллонов в CoilRepository.
 
     Аргументы:
-        mock_db_session (Mock): Мок-объект сессии базы данных.
+        fake_db_session (FakeSession): Фиктивная сессия базы данных.
     """
-    repo = CoilRepository(mock_db_session)
-    mock_db_session.query.return_value.all.return_value = []
+    repo = CoilRepository(fake_db_session)
+    fake_db_session.all_rows = []
 
     result = repo.get_coils()
 
     assert result == []
-    mock_db_session.query.assert_called_once_with(models.Coil)
+    assert fake_db_session.executed == 1
 
 
-def test_sqlalchemy_get_statistics_empty(mock_db_session):
-    """Тестирует получение статистики при пустой базе в SQLAlchemyCoilRepository.
+def test_sqlalchemy_get_statistics_empty(fake_db_session, now):
+    """Тестирует получение статистики при пустой базе в CoilRepository.
 
     Аргументы:
-        mock_db_session (Mock): Мок-объект сессии базы данных.
+        fake_db_session (FakeSession): Фиктивная сессия базы данных.
+        now (datetime): Зафиксированное текущее время.
     """
-    repo = CoilRepository(mock_db_session)
-    start_date = datetime.now(UTC) - timedelta(days=1)
-    end_date = datetime.now(UTC)
-
-    mock_db_session.query.return_value.filter.return_value.scalar.return_value = 0
-    mock_db_session.query.return_value.filter.return_value.first.return_value = None
-    mock_db_session.query.return_value.filter.return_value.count.return_value = (
-        0
-    )
-    mock_db_session.query.return_value.filter.return_value.scalar.return_value = (
-        0.0
-    )
+    repo = CoilRepository(fake_db_session)
+    start_date = now - timedelta(days=1)
+    end_date = now
+
+    fake_db_session.one_row = SimpleNamespace(added_count=0, removed_count=0)
+    fake_db_session.all_rows = []
 
     stats = repo.get_statistics(start_date, end_date)
 
-    assert stats.added_count == 0
-    assert stats.removed_count == 0
-    assert stats.avg_length is None
+    assert stats["added_count"] == 0
+    assert stats["removed_count"] == 0
+    assert stats["avg_length"] is None
 
 
 # Тесты для InMemoryCoilRepository
@@ -211,23 +284,30 @@ def test_inmemory_get_coils_with_filters():
     assert result[0] == coil
 
 
-def test_inmemory_get_statistics_empty():
-    """Тестирует получение статистики при пустом хранилище в InMemoryCoilRepository."""
+def test_inmemory_get_statistics_empty(now):
+    """Тестирует получение статистики при пустом хранилище в InMemoryCoilRepository.
+
+    Аргументы:
+        now (datetime): Зафиксированное текущее время.
+    """
     repo = InMemoryCoilRepository()
-    start_date = datetime.now(UTC) - timedelta(days=1)
-    end_date = datetime.now(UTC)
+    start_date = now - timedelta(days=1)
+    end_date = now
 
     stats = repo.get_statistics(start_date, end_date)
 
-    assert stats.added_count == 0
-    assert stats.removed_count == 0
-    assert stats.avg_length is None
+    assert stats["added_count"] == 0
+    assert stats["removed_count"] == 0
+    assert stats["avg_length"] is None
+
 
+def test_inmemory_get_statistics_with_data(now):
+    """Тестирует получение статистики с данными в InMemoryCoilRepository.
 
-def test_inmemory_get_statistics_with_data():
-    """Тестирует получение статистики с данными в InMemoryCoilRepository."""
+    Аргументы:
+        now (datetime): Зафиксированное текущее время.
+    """
     repo = InMemoryCoilRepository()
-    now = datetime.now(UTC)
     yesterday = now - timedelta(days=1)
     coil = repo.create_coil(schemas.CoilCreate(length=10.0, weight=20.0))
     coil.__dict__["date_added"] = yesterday
@@ -235,8 +315,27 @@ def test_inmemory_get_statistics_with_data():
 
     stats = repo.get_statistics(yesterday, now)
 
-    assert stats.added_count == 1
-    assert stats.removed_count == 1
-    assert stats.avg_length == 10.0
-    assert stats.avg_weight == 20.0
-    assert stats.total_weight == 20.0
+    assert stats["added_count"] == 1
+    assert stats["removed_count"] == 1
+    assert stats["avg_length"] == 10.0
+    assert stats["avg_weight"] == 20.0
+    assert stats["total_weight"] == 20.0
+
+
+def test_inmemory_get_statistics_empty_warehouse_weight_is_zero():
+    """Тестирует, что вес пустого склада по дням равен ровно нулю.
+
+    Данные те же, что в test_daily_stats_empty_warehouse_weight_is_zero:
+    репозиторий в памяти должен находить те же дни, что и суточная сводка.
+    """
+    repo = InMemoryCoilRepository()
+    for i, weight in enumerate((0.1, 0.2, 2.3)):
+        coil = repo.create_coil(schemas.CoilCreate(length=10.0, weight=weight))
+        coil.__dict__["date_added"] = datetime(2024, 1, 2, 10)
+        repo.remove_coil(coil.id, datetime(2024, 1, 3 + i, 10))
+
+    stats = repo.get_statistics(datetime(2024, 1, 1), datetime(2024, 1, 6))
+
+    assert stats["day_min_count"] == datetime(2024, 1, 1)
+    assert stats["day_min_weight"] == datetime(2024, 1, 1)
+    assert stats["day_max_weight"] == datetime(2024, 1, 3)